@@ -0,0 +1,175 @@
+import os
+import sys
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+from calculator import calculate, load_settings
+from database import ResultsDatabase
+from ingest import SUPPORTED_EXTENSIONS
+
+
+@dataclass
+class BatchResult:
+    input_file: str
+    output_file: str
+    status: bool
+    seconds: float
+    error: str = ''
+
+
+def find_input_files(source: str) -> list[str]:
+    """
+    Finds the trial workbooks to process.
+    :param source: a directory containing .xlsx, .csv or .parquet files, or a glob pattern
+    :return: a sorted list of input files
+    """
+    if os.path.isdir(source):
+        source = os.path.join(source, '*')
+
+    input_files = []
+    for input_file in sorted(glob.glob(source)):
+        file_name = os.path.basename(input_file)
+
+        # skip unsupported files, excel lock files and the output of a previous batch run
+        if os.path.splitext(file_name)[1].lower() not in SUPPORTED_EXTENSIONS or file_name.startswith('~$') or \
+                file_name.endswith('_scores.xlsx'):
+            continue
+
+        if os.path.isfile(input_file):
+            input_files.append(input_file)
+
+    return input_files
+
+
+def output_path(input_file: str, output_dir: str = None) -> str:
+    """
+    Determines where the results for an input file are written.
+    :param input_file: the input file
+    :param output_dir: the directory to write new files to, or None to write to a new worksheet of an .xlsx input
+    file, and to a new file next to any other input file
+    :return: the output file
+    """
+    stem, extension = os.path.splitext(input_file)
+    if output_dir is None:
+        # only .xlsx files have worksheets to write to
+        return input_file if extension.lower() == '.xlsx' else f"{stem}_scores.xlsx"
+
+    return os.path.join(output_dir, f"{os.path.basename(stem)}_scores.xlsx")
+
+
+def _calculate_one(input_file: str, output_file: str, competition_type: str, break_tie: bool,
+                   use_cache: bool, database_file: str) -> BatchResult:
+    """
+    Runs a single calculation, capturing any error instead of raising it so one bad workbook does not abort the batch.
+    """
+    start = time.perf_counter()
+    try:
+        status = bool(calculate(input_file, output_file, competition_type, break_tie, use_cache=use_cache,
+                                     database_file=database_file))
+        error = '' if status else "Unknown"
+    except Exception as e:
+        status = False
+        error = f"{type(e).__name__}: {e.args[-1] if e.args else e}"
+
+    return BatchResult(input_file, output_file, status, time.perf_counter() - start, error)
+
+
+def run_jobs(function: Callable, jobs: list[tuple], died: Callable[[tuple, str], object], workers: int = None) -> list:
+    """
+    Runs a function on each job over a pool of processes, or in this process if there is one worker or one job.
+    :param function: a module level function, called with the arguments of a job, which captures its own errors
+    :param jobs: the arguments of each call
+    :param died: makes the result of a job whose worker process itself died, from the job and the error
+    :param workers: the number of worker processes, defaults to the number of cores
+    :return: the result of each job, in the same order as the jobs
+    """
+    if workers == 1 or len(jobs) == 1:
+        return [function(*job) for job in jobs]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(function, *job) for job in jobs]
+        for job, future in zip(jobs, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:  # the worker process itself died
+                results.append(died(job, f"{type(e).__name__}: {e}"))
+
+    return results
+
+
+def print_results(names: list[str], results: list) -> int:
+    """
+    Prints the time taken and the status of each calculation, then how many completed.
+    :param names: the name of each calculation, such as its input file
+    :param results: the result of each calculation, with its status, seconds and error
+    :return: the exit code, 1 if any calculation failed
+    """
+    for name, result in zip(names, results):
+        status = "Complete" if result.status else f"Error: {result.error}"
+        print(f"{name}\t{result.seconds:.2f}s\t{status}")
+
+    failures = sum(not result.status for result in results)
+    print(f"{len(results) - failures} of {len(results)} complete")
+
+    return 1 if failures else 0
+
+
+def calculate_batch(source: str, competition_type: str, output_dir: str = None, break_tie: bool = False,
+                    workers: int = None, use_cache: bool = True, database_file: str = None) -> list[BatchResult]:
+    """
+    Calculates the winners of every trial workbook in a directory or glob pattern, spread over a pool of processes.
+    :param source: a directory containing .xlsx, .csv or .parquet files, or a glob pattern
+    :param competition_type: the type of competition
+    :param output_dir: the directory to write new files to, or None to write to a new worksheet of each .xlsx input
+    file, and to a new file next to any other input file
+    :param break_tie: break ties by class if possible
+    :param workers: the number of worker processes, defaults to the number of cores
+    :param use_cache: reuse the results of unchanged input files from the result cache
+    :param database_file: also store the contestants and winners of each trial in this results database
+    :return: a result for each input file, in the same order as the input files
+    """
+    input_files = find_input_files(source)
+    if not input_files:
+        raise FileNotFoundError("no .xlsx, .csv or .parquet files found")
+
+    # create the settings file and the results database up front so the workers don't race to create them
+    load_settings()
+    if database_file is not None:
+        ResultsDatabase(database_file).close()
+
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    jobs = [(input_file, output_path(input_file, output_dir), competition_type, break_tie, use_cache,
+             database_file) for input_file in input_files]
+
+    return run_jobs(_calculate_one, jobs, lambda job, error: BatchResult(job[0], job[1], False, 0.0, error), workers)
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="calculator.py batch",
+                                     description="Determine the winners of every dog show in a directory.")
+    parser.add_argument('source', help="a directory of .xlsx, .csv or .parquet files, or a glob pattern")
+    parser.add_argument('competition_type', choices=['obedience', 'rally'], help="the type of competition")
+    parser.add_argument('-n', '--no_ties', action='store_true', help="break ties by class if possible")
+    parser.add_argument('-o', '--output_dir', help="write each result to a new file in this directory, by default "
+                                                       "results are written to a Winners worksheet of each .xlsx "
+                                                       "file and to a new file next to each other file")
+    parser.add_argument('-w', '--workers', type=int, help="the number of worker processes")
+    parser.add_argument('--no_cache', action='store_true', help="don't reuse or store results in the result cache")
+    parser.add_argument('--database', help="also store the contestants and winners in this results database")
+    args = parser.parse_args(argv)
+
+    results = calculate_batch(args.source, args.competition_type, args.output_dir, args.no_ties, args.workers,
+                              not args.no_cache, args.database)
+
+    return print_results([result.input_file for result in results], results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+import tempfile
+import statistics
+from dataclasses import asdict
+
+import openpyxl
+
+from calculator import calculate, STAGES
+from synthetic import TrialSpec, write_trial
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_golden.json")
+
+# (entries, classes, groups) of each default scale, from a local trial to a national event
+SCALES = ((100, 8, 7), (1000, 12, 7), (10000, 20, 7), (50000, 30, 7))
+
+
+def scale_of(entries: int) -> tuple[int, int, int]:
+    """
+    The (entries, classes, groups) of a trial of this many entries, with the classes and groups of the largest default
+    scale it reaches, so a default number of entries gives the default trial and matches its golden digest.
+    """
+    _, classes, groups = max((scale for scale in SCALES if scale[0] <= entries), default=SCALES[0])
+    return entries, classes, groups
+
+
+def results_digest(output_file: str) -> str:
+    """
+    Hashes the values of the results worksheet, so outputs can be compared without storing them. Tied rows may be
+    written in any order, see canonical_results.
+    :param output_file: an output file of calculate
+    :return: the sha256 hex digest of the worksheet values
+    """
+    workbook = openpyxl.load_workbook(output_file, read_only=True)
+    try:
+        rows = [list(row) for row in workbook.worksheets[-1].iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+    return hashlib.sha256(json.dumps(canonical_results(rows), default=str).encode()).hexdigest()
+
+
+def canonical_results(rows: list[list]) -> list:
+    """
+    Puts the values of a results worksheet in a form that doesn't depend on the order of tied rows, as ties have no
+    order of their own. Each run of class placements with the same score, and each award's winners, who all tie, are
+    compared as a set. A tie at the last of the four places is compared by its score and size only, as which of the
+    tied contestants fill the last places is a matter of order too, and so are award winners without their armband
+    number, as a combined award winner is shown with whichever of their tied best entries comes first.
+    :param rows: the values of each row of the worksheet
+    :return: a list of the classes, the awards header and the awards, in the order they are written
+    """
+    def value(cell):
+        if cell == '':
+            return None
+        return int(cell) if isinstance(cell, float) and cell.is_integer() else cell
+
+    blocks, block, awards = [], None, False
+    for row in rows:
+        row = [value(cell) for cell in row] + [None] * (5 - len(row))
+        if all(cell is None for cell in row):
+            continue
+
+        if not awards and row[0] is None and all(cell is None for cell in row[2:]):  # a class heading
+            block = {"class": row[1], "header": None, "rows": []}
+            blocks.append(block)
+        elif not awards and block is not None and block["header"] is None:
+            block["header"] = row[1:]
+        elif not awards and row[0] is None and row[4] is None:  # the header row of the awards
+            awards = True
+            blocks.append({"awards": row[1:4]})
+        elif not awards:
+            block["rows"].append(row)
+        elif row[0] is not None:
+            block = {"award": row[0], "rows": [row[2:]]}
+            blocks.append(block)
+        else:
+            block["rows"].append(row[2:])
+
+    canonical = []
+    for block in blocks:
+        if "class" in block:
+            runs = {}
+            for row in block["rows"]:
+                runs.setdefault(row[4], []).append(str(row[1:4]))
+            runs = [[score, sorted(contestants)] for score, contestants in runs.items()]
+            if len(block["rows"]) == 4:
+                runs[-1][1] = len(runs[-1][1])
+            canonical.append(["class", block["class"], block["header"], runs])
+        elif "award" in block:
+            canonical.append(["award", block["award"], sorted(str(row) for row in block["rows"])])
+        else:
+            canonical.append(["awards", block["awards"]])
+
+    return canonical
+
+
+def time_stages(input_file: str, output_file: str, competition_type: str, break_tie: bool) -> dict[str: float]:
+    """
+    Runs calculate once, timing each of its stages with its run report.
+    :return: a dictionary of stage to seconds, plus the total
+    """
+    run_report = calculate(input_file, output_file, competition_type, break_tie)
+
+    timings = {stage: stage_report.seconds for stage, stage_report in run_report.stages.items()}
+    timings["total"] = run_report.seconds
+
+    return timings
+
+
+def run_benchmark(specs: list[TrialSpec], repeat: int = 3, break_tie: bool = False, golden: dict = None) -> list[dict]:
+    """
+    Times each stage of calculate on synthetic trials, taking the median of each stage over repeat runs, and checks
+    the results against their golden digests.
+    :param specs: the trials to generate
+    :param repeat: the number of runs per trial
+    :param break_tie: break ties by class if possible
+    :param golden: a dictionary of trial name to the digest of its expected results
+    :return: a result per trial, with its stage timings, digest, and whether the digest matches the golden one (None
+    if there is no golden digest)
+    """
+    results = []
+    working_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)  # so the default settings are used
+        try:
+            results += [_benchmark_trial(spec, directory, repeat, break_tie, golden) for spec in specs]
+        finally:
+            os.chdir(working_directory)
+
+    return results
+
+
+def _benchmark_trial(spec: TrialSpec, directory: str, repeat: int, break_tie: bool, golden: dict) -> dict:
+    input_file = write_trial(spec, os.path.join(directory, f"{spec.name}.xlsx"))
+    output_file = os.path.join(directory, f"{spec.name}_scores.xlsx")
+
+    runs = [time_stages(input_file, output_file, spec.competition_type, break_tie) for _ in range(repeat)]
+    digest = results_digest(output_file)
+    name = f"{spec.name}-{int(break_tie)}"
+
+    return {
+        "name": name,
+        "spec": spec,
+        "seconds": {stage: statistics.median(run[stage] for run in runs) for stage in STAGES + ("total",)},
+        "digest": digest,
+        "matches golden": None if golden is None or name not in golden else golden[name] == digest,
+    }
+
+
+def load_golden() -> dict:
+    if not os.path.exists(GOLDEN_FILE):
+        return {}
+
+    with open(GOLDEN_FILE, 'r') as f:
+        return json.load(f)
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time each stage of the calculator on synthetic trials.")
+    parser.add_argument('-t', '--competition_types', nargs='+', choices=['obedience', 'rally'],
+                        default=['obedience', 'rally'], help="the types of competition")
+    parser.add_argument('--entries', type=int, nargs='+',
+                        help="the number of entries of each trial, with the classes and groups of the largest default "
+                             "scale it reaches")
+    parser.add_argument('--classes', type=int, default=None, help="the number of classes, instead of the scale's")
+    parser.add_argument('--groups', type=int, default=None, help="the number of groups, instead of the scale's")
+    parser.add_argument('--non_qualifying', type=float, default=0.1, help="the share of AB and NQ scores")
+    parser.add_argument('--pluses', type=float, default=0.1, help="the share of scores with '+' tie breakers")
+    parser.add_argument('--champions', type=float, default=0.2, help="the share of champion dogs")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="the number of runs per trial")
+    parser.add_argument('-n', '--no_ties', action='store_true', help="break ties by class if possible")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    parser.add_argument('--update_golden', action='store_true', help="store the digests of these results as golden")
+    args = parser.parse_args(argv)
+
+    scales = SCALES if args.entries is None else [scale_of(entries) for entries in args.entries]
+    specs = [TrialSpec(competition_type, entries, args.classes or classes, args.groups or groups,
+                       args.non_qualifying, args.pluses, args.champions)
+             for competition_type in args.competition_types for entries, classes, groups in scales]
+
+    golden = load_golden()
+    results = run_benchmark(specs, args.repeat, args.no_ties, golden)
+
+    if args.json:
+        print(json.dumps([{**result, "spec": asdict(result["spec"])} for result in results], indent=2))
+    else:
+        print("trial".ljust(48) + "".join(stage.rjust(9) for stage in STAGES + ("total",)) + "  golden")
+        for result in results:
+            check = {None: "new", True: "ok", False: "MISMATCH"}[result["matches golden"]]
+            print(result["name"].ljust(48) + "".join(f"{result['seconds'][stage]:9.3f}"
+                                                     for stage in STAGES + ("total",)) + f"  {check}")
+
+    if args.update_golden:
+        golden.update({result["name"]: result["digest"] for result in results})
+        with open(GOLDEN_FILE, 'w') as f:
+            json.dump(golden, f, indent=2, sort_keys=True)
+        return 0
+
+    return 1 if any(result["matches golden"] is False for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import os
+import glob
+import pickle
+import hashlib
+import tempfile
+from typing import Optional
+
+import pandas
+from pandas.core.frame import DataFrame
+
+from ranking import RESULTS_VERSION
+
+# bumped whenever the cached results change shape, so results of an older version are never reused
+CACHE_VERSION = 2
+
+
+def cache_key(data: DataFrame, column_names: dict[str: str], competition_type: str, break_tie: bool,
+              class_hierarchy: list[str]) -> str:
+    """
+    Hashes everything the results of a calculation depend on: the needed columns of the input, the class hierarchy,
+    the type of competition, whether ties are broken by class and the version of the rules that find the results.
+    :param data: the contestants as read by read_contestants
+    :param column_names: the column names found by find_feature_names
+    :param competition_type: the type of competition
+    :param break_tie: break ties by class if possible
+    :param class_hierarchy: the class hierarchy from the settings
+    :return: the sha256 hex digest of the inputs
+    """
+    digest = hashlib.sha256(repr((CACHE_VERSION, RESULTS_VERSION, sorted(column_names.items()), competition_type,
+                                  bool(break_tie), list(class_hierarchy))).encode())
+    digest.update(pandas.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    A persistent cache of calculation results, one pickle file per key in a directory. The least recently used results
+    are evicted once the directory grows over its size limit, using the modification time of each file as its last use.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> Optional['ResultCache']:
+        """
+        Creates the cache described by the "cache" settings, if enabled.
+        :param settings: the settings loaded by load_settings
+        :return: the cache, or None if the cache is disabled
+        """
+        cache_settings = settings.get("cache", {})
+        if not cache_settings.get("enabled", True):
+            return None
+
+        return cls(cache_settings.get("directory", "cache"), int(cache_settings.get("max megabytes", 64) * 1024 * 1024))
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Loads the results stored under key, marking them as recently used.
+        :return: the results, or None if there are none
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                results = pickle.load(f)
+        except Exception:  # missing, unreadable, or a pickle that no longer loads, such as one of another pandas version
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:  # only its place in the eviction order is lost
+            pass
+
+        return results
+
+    def put(self, key: str, results: dict) -> None:
+        """
+        Stores results under key, then evicts the least recently used results until the cache fits its size limit.
+        The results are not stored if the cache directory can't be written, as the cache only saves time.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            # write to a temporary file first, so other processes never read a partly written file
+            handle, temporary_file = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_file, self._path(key))
+        except BaseException as e:
+            try:
+                os.remove(temporary_file)
+            except OSError:
+                pass
+
+            if isinstance(e, (OSError, pickle.PicklingError)):
+                return
+            raise
+
+        self._evict()
+
+    def invalidate(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        for path in glob.glob(os.path.join(self.directory, '*.pickle')):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def _evict(self) -> None:
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*.pickle')):
+            try:
+                stat = os.stat(path)
+            except OSError:  # evicted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:  # evicted by another process, or not ours to remove
+                pass
+            total -= size
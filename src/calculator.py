@@ -1,358 +1,456 @@
 import os
+import sys
+import time
+import datetime
 import argparse
 import json
-import pandas
+import cProfile
+import importlib
+import tracemalloc
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Optional
 from pandas.core.frame import DataFrame
 from pandas.core.series import Series
 
-import openpyxl
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.worksheet.worksheet import Worksheet
-
-
-def calculate(input_file: str, output_file: str, competition_type: str, break_tie: bool = False) -> bool:
-    def find_feature_names(dataframe: DataFrame) -> dict[str: str]:
-        feature_names = {}
-        column_keys = dataframe.keys()
-
-        # determine number column
-        column_matches = column_keys[column_keys.astype(str).str.match(r'.*number.*', case=False)]
-        if len(column_matches) == 1:
-            feature_names["number"] = column_matches[0]
-        elif len(column_matches) > 1:
-            raise KeyError("multiple 'number' columns detected")
-        else:
-            raise KeyError("no 'number' column detected")
-
-        # determine handler column
-        column_matches = column_keys[column_keys.astype(str).str.match(r'.*handler.*', case=False)]
-        if len(column_matches) == 1:
-            feature_names["handler"] = column_matches[0]
-        elif len(column_matches) > 1:
-            raise KeyError("multiple 'handler' columns detected")
-        else:
-            raise KeyError("no 'handler' column detected")
-
-        # determine call name column
-        column_matches = column_keys[column_keys.astype(str).str.match(r'.*call name.*', case=False)]
-        if len(column_matches) == 1:
-            feature_names["call name"] = column_matches[0]
-        elif len(column_matches) > 1:
-            raise KeyError("multiple 'call name' columns detected")
-        else:
-            raise KeyError("no 'call name' column detected")
-
-        # determine class column
-        column_matches = column_keys[column_keys.astype(str).str.match(r'.*class.*', case=False)]
-        if len(column_matches) == 1:
-            feature_names["class"] = column_matches[0]
-        elif len(column_matches) > 1:
-            raise KeyError("multiple 'class' columns detected")
-        else:
-            raise KeyError("no 'class' column detected")
-
-        # determine score column
-        column_matches = column_keys[column_keys.astype(str).str.match(r'.*score.*', case=False)]
-        if len(column_matches) == 1:
-            feature_names["score"] = column_matches[0]
-        elif len(column_matches) > 1:
-            raise KeyError("multiple 'score' columns detected")
-        else:
-            raise KeyError("no 'score' column detected")
-
-        if competition_type == 'obedience':
-            # determine champion column
-            column_matches = column_keys[column_keys.astype(str).str.match(r'.*champ.*', case=False)]
-            if len(column_matches) == 1:
-                feature_names["champion"] = column_matches[0]
-            elif len(column_matches) > 1:
-                raise KeyError("multiple 'champion' columns detected")
-
-            # determine group column
-            column_matches = column_keys[column_keys.astype(str).str.match(r'.*group.*', case=False)]
-            if len(column_matches) == 1:
-                feature_names["group"] = column_matches[0]
-            elif len(column_matches) > 1:
-                raise KeyError("multiple 'group' columns detected")
-            else:
-                raise KeyError("no 'group' column detected")
-
-        return feature_names
-
-    def augment_data(contestants: DataFrame) -> DataFrame:
+
+from cache import ResultCache, cache_key
+from database import ResultsDatabase
+from ingest import SUPPORTED_EXTENSIONS, read_contestants
+from ranking import parse_scores, sort_keys, sort_contestants, class_placements, group_highs, combined_winners, \
+    class_category_index, award_eligible, class_ranks, CombinedAward
+from writer import WinnersWriter, OpenpyxlWriter, PackageWriter, XlsxWriterWriter
+
+# the stages of a calculation, in the order they are reported to the progress callback
+STAGES = ("read", "clean", "rank", "awards", "write", "save")
+
+DEFAULT_SETTINGS = {"class hierarchy": ["utility", "open", "novice"],
+                    "defaults": {"break ties by class": True, "write to new file": True},
+                    "cache": {"enabled": True, "directory": "cache", "max megabytes": 64}}
+
+# the other modes, run as 'calculator.py <subcommand>', by the module whose main parses the rest of the arguments
+SUBCOMMANDS = {"batch": "batch", "watch": "watch", "sheets": "sheets", "serve": "service", "database": "database"}
+
+# the combined score awards of each competition, award name to the class categories whose scores it combines
+COMBINED_AWARDS = {
+    "obedience": {
+        "High Combined (Open B + Utility B)": CombinedAward(("open b", "utility b")),
+        "High Combined Preferred (Preferred Open + Preferred Utility)":
+            CombinedAward(("preferred open", "preferred utility"), preferred=True),
+    },
+    "rally": {
+        "High Combined (Rally Excellent B + Rally Advanced B)":
+            CombinedAward(("rally excellent b", "rally advanced b")),
+        "High Triple (High Combined + Rally Master)":
+            CombinedAward(("rally excellent b", "rally advanced b", "rally master")),
+    },
+}
+
+
+class CalculationCancelled(Exception):
+    """
+    Raised by a progress callback to stop a calculation before its next stage.
+    """
+
+
+@dataclass
+class StageReport:
+    seconds: float = 0.0
+    peak_memory: Optional[int] = None  # in bytes, only measured when tracing memory
+
+
+@dataclass
+class RunReport:
+    """
+    The timings and sizes of a calculation, returned by calculate.
+    """
+    input_file: str
+    output_file: str
+    competition_type: str
+    stages: dict[str, StageReport] = field(default_factory=dict)
+    rows: int = 0  # entries read from the input file
+    contestants: int = 0  # entries with a qualifying score
+    classes: int = 0
+    awards: int = 0  # awards and group highs computed
+    cached: bool = False  # the results were reused from the result cache, skipping the clean, rank and awards stages
+    seconds: float = 0.0
+    trace_memory: bool = False
+    _stage: Optional[str] = field(default=None, repr=False)
+    _stage_start: float = field(default=0.0, repr=False)
+    _tracing: bool = field(default=False, repr=False)
+
+    def start_stage(self, stage: str) -> None:
         """
-        Removes nan rows and removes contestants with 'AB' or 'NQ' scores.
-        :param contestants: a dataframe of contestants
-        :return: a dataframe of contestants
+        Finishes the current stage and starts timing the next one.
         """
+        self._finish_stage()
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True  # only stop tracing that was started here
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+
+        self._stage = stage
+        self._stage_start = time.perf_counter()
+
+    def finish(self) -> None:
+        self._finish_stage()
+        self.seconds = sum(stage.seconds for stage in self.stages.values())
+
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def to_dict(self) -> dict:
+        return {key: value for key, value in asdict(self).items() if not key.startswith('_')}
+
+    def _finish_stage(self) -> None:
+        if self._stage is None:
+            return
+
+        self.stages[self._stage] = StageReport(time.perf_counter() - self._stage_start,
+                                               tracemalloc.get_traced_memory()[1] if self.trace_memory else None)
+        self._stage = None
+
+
+def load_settings(settings_file: str = "settings.json") -> dict:
+    """
+    Loads the settings file, creating it with the default settings if it does not exist yet.
+    :param settings_file: the path to the settings file
+    :return: the settings
+    """
+    if not os.path.exists(settings_file):
+        with open(settings_file, 'w') as f:
+            json.dump(DEFAULT_SETTINGS, f)
+
+    with open(settings_file, 'r') as f:
+        return json.load(f)
+
+
+def augment_data(contestants: DataFrame, column_names: dict[str: str], class_hierarchy: list[str]) -> DataFrame:
+    """
+    Removes nan rows and removes contestants with 'AB' or 'NQ' scores.
+    :param contestants: a dataframe of contestants
+    :param column_names: the column names found by find_feature_names
+    :param class_hierarchy: the class hierarchy from the settings
+    :return: a dataframe of contestants
+    """
+
+    # remove NaN entries and remove contestants who did not qualify or were absent
+    scores = parse_scores(contestants[column_names["score"]])
+    contestants = contestants.loc[scores["score"].notna()].copy()
+
+    # convert scores with + values to their base floats, with the count of +s in another column
+    contestants[column_names["score"]] = scores.loc[contestants.index, "score"]
+    contestants['Pluses'] = scores.loc[contestants.index, "pluses"]
 
-        # remove NaN entries and remove contestants who did not qualify or were absent
-        contestants = contestants.loc[(~contestants[column_names["score"]].isna()) &
-                                      (~contestants[column_names["score"]].astype(str).str.match(r'\D+', na=False))].copy()
+    # rank classes by the class hierarchy, all other classes are ranked last
+    contestants['Class Rank'] = class_ranks(contestants[column_names["class"]], class_hierarchy)
 
-        # convert scores with + values to their base floats, with the count of +s in another column
-        contestants.loc[:, 'Pluses'] = contestants[column_names["score"]].astype(str).str.count(r'\+')
-        contestants.loc[:, column_names["score"]] = contestants[column_names["score"]].astype(str).replace(r'\++', '', regex=True).astype(float)
+    contestants['Sort Key'] = sort_keys(contestants[column_names["score"]], contestants['Class Rank'],
+                                        contestants['Pluses'], class_hierarchy)
 
-        rank_dict = {class_.lower(): len(settings["class hierarchy"]) - rank for rank, class_ in
-                     enumerate(settings["class hierarchy"])}
-        rank_dict[r".+"] = 0  # all other classes are ranked last
-        contestants.loc[:, 'Class Rank'] = contestants[column_names["class"]].astype(str).str.lower().replace(rank_dict, regex=True)
+    return contestants
 
+
+def find_winners(contestants: DataFrame, condition: Series, column_names: dict[str: str],
+                 break_tie: bool = False) -> DataFrame:
+
+    # separate out contestants meeting condition
+    contestants = contestants.loc[condition]
+
+    # in case the contestants only had excluded classes
+    if contestants.shape[0] == 0:
         return contestants
 
-    def find_winners(contestants: DataFrame, condition: Series, is_award: bool, combine_scores=False,
-                     break_tie: bool = False) -> DataFrame:
-
-        # separate out contestants meeting condition and sort them based on numerical score
-        contestants = contestants.loc[condition].sort_values(column_names["score"], ascending=False).copy()  # copy dataframe
-
-        '''# if no contestants match criteria, return
-        if contestants.shape[0] == 0:
-            return contestants'''
-
-        if is_award:
-            # exclude beginner and preferred classes
-            contestants = contestants.loc[
-                (~contestants[column_names["class"]].astype(str).str.contains(r'begin|preferred', case=False))].copy()
-
-            # in case the contestants only had excluded classes
-            if contestants.shape[0] == 0:
-                return contestants
-
-            # only used for specific awards
-            if combine_scores:
-
-                # pull out contestants that appear in all classes
-                contestant_class_counts = contestants[column_names["call name"]].value_counts()
-                contestants_in_all_classes = contestants[contestants[column_names["call name"]].isin(
-                    contestant_class_counts.index[contestant_class_counts.ge(combine_scores)])]
-                contestant_scores = contestants_in_all_classes.groupby(column_names["call name"])[column_names["score"]].sum().sort_values(
-                    ascending=False)
-                winning_contestants = contestant_scores.loc[contestant_scores == contestant_scores.max()]
-                winning_info = contestants[contestants[column_names["call name"]].isin(winning_contestants.keys())]
-
-                combined_info = winning_info[~winning_info[column_names["call name"]].duplicated()]
-                combined_info.loc[:, column_names["score"]] = winning_contestants.max()
-
-                if break_tie and combined_info.shape[0] > 1:
-                    # sort based on class and scores
-                    sorted_winning_contestants = contestants[
-                        contestants[column_names["call name"]].isin(winning_contestants.keys())].sort_values(
-                        ['Class Rank', column_names["score"], 'Pluses'], ascending=False)
-
-                    return combined_info[combined_info[column_names["call name"]] == sorted_winning_contestants.iloc[0][column_names["call name"]]]
-
-                else:
-                    return combined_info
-
-            else:
-                # the highest scores amongst contestants
-                contestants = contestants[contestants[column_names["score"]] == contestants[column_names["score"]].max()]
-                if break_tie:  # break tie by class
-                    score, class_rank, pluses = \
-                        contestants.sort_values([column_names["score"], 'Class Rank', 'Pluses'], ascending=False).iloc[0][
-                            [column_names["score"], 'Class Rank', 'Pluses']]
-                    return contestants.loc[(contestants[column_names["score"]] == score) &
-                                           (contestants['Class Rank'] == class_rank) &
-                                           (contestants['Pluses'] == pluses)]
-                else:
-                    # if there is more than one class, don't break by pluses
-                    if len(contestants[column_names["class"]].unique()) > 1:
-                        return contestants
-                    else:
-                        score, pluses = contestants.sort_values([column_names["score"], 'Pluses'], ascending=False).iloc[0][
-                            [column_names["score"], 'Pluses']]
-                        return contestants.loc[(contestants[column_names["score"]] == score) &
-                                               (contestants['Pluses'] == pluses)]
-
-        # all the same class, return top 4, tie breaking done by pluses
-        else:
-            return contestants.sort_values([column_names["score"], 'Pluses'], ascending=False)[:4]
-
-    def write_winners(workbook: Workbook, contestants: DataFrame, competition_name: str, is_award: bool) -> None:
-        winners = contestants.copy().reset_index()
-
-        if is_award:
-            if winners.shape[0] < 1:
-                workbook.append([competition_name] + ['-'] * 4)
-                workbook[f"A{workbook.max_row}"].font = Font(bold=True)
-
-            else:
-                # convert scores with + values to back to their display scores
-                winners.loc[:, 'Pluses'] = pandas.Series(['+'] * winners.shape[0]).str.repeat(winners['Pluses']).astype(str).copy()
-                winners.loc[:, 'Score'] = winners['Score'].astype(int).astype(str) + winners['Pluses']
-                for w, winners in enumerate(
-                        dataframe_to_rows(winners[[column_names["number"], column_names["handler"], column_names["call name"], column_names['score']]], index=False,
-                                          header=False)):
-                    if w == 0:
-                        workbook.append([competition_name] + winners)
-
-                        # format competition name
-                        workbook[f"A{workbook.max_row}"].font = Font(bold=True)
-                    else:
-                        workbook.append([''] + winners)
-
-        else:
-            # write competition name and format cells
-            workbook.append(['', competition_name])
-            workbook[f"B{workbook.max_row}"].font = Font(bold=True)
-            workbook[f"B{workbook.max_row}"].alignment = Alignment(horizontal='center')
-            workbook.merge_cells(start_row=workbook.max_row, start_column=2, end_row=workbook.max_row, end_column=5)
-
-            # write subheaders
-            workbook.append(['', column_names["number"], column_names["handler"], column_names["call name"], column_names["score"]])
-            workbook[f"B{workbook.max_row}"].font = Font(bold=True)  # TODO: probably a better way to do more than one
-            workbook[f"C{workbook.max_row}"].font = Font(bold=True)
-            workbook[f"D{workbook.max_row}"].font = Font(bold=True)
-            workbook[f"E{workbook.max_row}"].font = Font(bold=True)
-
-            color_key = {0: '000000FF', 1: '00FF0000', 2: '00FFFF00', 3: '00FFFFFF'}
-            text_key = {0: '00FFFFFF', 1: '00FFFFFF', 2: '00000000', 3: '00000000'}
-
-            # write winners
-            if winners.shape[0] < 1:
-                workbook.append([''] + ['-'] * 4)
-            else:
-                # convert scores with + values to back to their display scores
-                winners.loc[:, 'Pluses'] = pandas.Series(['+'] * winners.shape[0]).str.repeat(winners['Pluses']).astype(str).copy()
-                winners.loc[:, 'Score'] = winners['Score'].astype(int).astype(str) + winners['Pluses']
-
-                position = list(range(1, winners.shape[0] + 1))
-                for w, winners in enumerate(
-                        dataframe_to_rows(winners[[column_names["number"], column_names["handler"], column_names["call name"], column_names["score"]]], index=False,
-                                          header=False)):
-                    workbook.append([position[w]] + winners)
-
-                    workbook[f"B{workbook.max_row}"].font = Font(color=text_key[w])
-                    workbook[f"B{workbook.max_row}"].fill = PatternFill(start_color=color_key[w],
-                                                                        end_color=color_key[w], fill_type='solid')
-                    workbook[f"C{workbook.max_row}"].font = Font(color=text_key[w])
-                    workbook[f"C{workbook.max_row}"].fill = PatternFill(start_color=color_key[w],
-                                                                        end_color=color_key[w], fill_type='solid')
-                    workbook[f"D{workbook.max_row}"].font = Font(color=text_key[w])
-                    workbook[f"D{workbook.max_row}"].fill = PatternFill(start_color=color_key[w],
-                                                                        end_color=color_key[w], fill_type='solid')
-                    workbook[f"E{workbook.max_row}"].font = Font(color=text_key[w])
-                    workbook[f"E{workbook.max_row}"].fill = PatternFill(start_color=color_key[w],
-                                                                        end_color=color_key[w], fill_type='solid')
-
-            workbook.append([''])
-
-    def optimal_width(sheet: Worksheet) -> None:
-        """
-        Formats the worksheet so each column is the width of the largest cell value.
-        :param sheet: the worksheet to resize
-        """
-        for column in sheet.columns:
-            new_column_length = max(len(str(cell.value)) for cell in column)  # find max cell width in column
-            column_letter = openpyxl.utils.get_column_letter(column[0].column)
-            sheet.column_dimensions[column_letter].width = new_column_length
+    # the highest scores amongst contestants
+    contestants = contestants[contestants[column_names["score"]] == contestants[column_names["score"]].max()]
 
-    # make sure input file is valid
-    if input_file[-5:] != '.xlsx':
-        raise TypeError("only .xlsx is supported")
+    # if there is more than one class and ties are not broken by class, don't break by pluses
+    if not break_tie and len(contestants[column_names["class"]].unique()) > 1:
+        return contestants
 
-    # check to see if file exists
-    if not os.path.exists(input_file):
-        raise FileNotFoundError("file not found")
+    # otherwise break the tie by class, then by pluses, with the sort key
+    return contestants.loc[contestants['Sort Key'] == contestants['Sort Key'].max()]
+
+
+def champions_of_record(contestants: DataFrame, column_names: dict[str: str]) -> Series:
+    """
+    The contestants eligible for High Scoring Champion of Record, by their champion column.
+    """
+    return contestants[column_names["champion"]].astype(str).str.contains('Ch', na=False)
+
+
+def find_awards(contestants: DataFrame, ranked: DataFrame, column_names: dict[str: str], competition_type: str,
+                break_tie: bool = False) -> list[tuple]:
+    """
+    Finds the winners of every award of a competition, and the group highs of an obedience trial.
+    :param contestants: a dataframe of contestants cleaned by augment_data
+    :param ranked: the same contestants sorted by sort_contestants
+    :param column_names: the column names found by find_feature_names
+    :param competition_type: the type of competition, 'obedience' or 'rally'
+    :param break_tie: break ties by class if possible
+    :return: a list of (award, winners) pairs, in the order they are written
+    """
+    # classify each distinct class once, awards are then based on lookups into the category index
+    categories = class_category_index(contestants[column_names["class"]])
+    # single score awards and group highs exclude beginner and preferred classes
+    eligible = award_eligible(categories)
+
+    if competition_type not in COMBINED_AWARDS:
+        raise ValueError("competition_type must be 'obedience' or 'rally'")
 
-    # import settings
-    if os.path.exists("settings.json"):
-        with open("settings.json", 'r') as f:
-            settings = json.load(f)
+    # all combined awards are found together from one score matrix
+    combined = combined_winners(ranked, column_names, categories, COMBINED_AWARDS[competition_type], break_tie)
+
+    # the single score awards go to the highest eligible score, written around the combined awards
+    if competition_type == "obedience":
+        awards = [("High in Trial (All Classes)", find_winners(contestants, categories["all"] & eligible, column_names,
+                                                               break_tie))]
+        awards += list(combined.items())
+        if 'champion' in column_names:
+            awards.append(("High Scoring Champion of Record",
+                           find_winners(contestants, champions_of_record(contestants, column_names) & eligible,
+                                        column_names, break_tie)))
     else:
-        with open("settings.json", 'w') as f:
-            json.dump({"class hierarchy": ["utility", "open", "novice"],
-                       "defaults": {"break ties by class": True, "write to new file": True}}, f)
+        awards = list(combined.items())
 
-        settings = json.load(f)
+    if competition_type == "obedience":
+        groups = [group for group in contestants[column_names["group"]].unique() if str(group) != 'nan']  # find set of groups
 
-    data = pandas.read_excel(input_file)
+        # find group winners
+        highs = group_highs(ranked, column_names, eligible, break_tie)
+        awards += [(group, highs.get(group, contestants.iloc[:0])) for group in groups]
+
+    return awards
+
+
+def calculate_results(data: DataFrame, column_names: dict[str: str], competition_type: str, break_tie: bool,
+                      class_hierarchy: list[str], report: Callable[[str], None] = None) -> dict:
+    """
+    Cleans and ranks the contestants of a trial, then finds the class placements and the award winners.
+    :param data: the contestants as read by read_contestants
+    :param column_names: the column names found by find_feature_names
+    :param competition_type: the type of competition, 'obedience' or 'rally'
+    :param break_tie: break ties by class if possible
+    :param class_hierarchy: the class hierarchy from the settings
+    :param report: called with the "clean", "rank" and "awards" stages as they start
+    :return: a dictionary of the "classes", their "placements", the "awards" as (award, winners) pairs and the cleaned
+    "contestants"
+    """
+    if report is None:
+        report = lambda stage: None
+
+    report("clean")
+    classes = data[column_names["class"]].dropna().unique()  # find set of classes
 
-    # find column names
-    column_names = find_feature_names(data)
+    # remove nan rows and contestants with non-scores
+    contestants = augment_data(data, column_names, class_hierarchy)
 
-    classes = data[column_names["class"]].dropna().unique()  # find set of classes
+    # sort contestants once, then find class placements in one grouped pass
+    report("rank")
+    ranked = sort_contestants(contestants)
+    placements = class_placements(ranked, column_names)
 
-    data = augment_data(data)  # remove nan rows and contestants with non-scores
+    report("awards")
+    awards = find_awards(contestants, ranked, column_names, competition_type, break_tie)
 
+    return {"classes": classes, "placements": placements, "awards": awards, "contestants": contestants}
+
+
+def create_writer(input_file: str, output_file: str, engine: str, column_names: dict[str: str]) -> WinnersWriter:
+    """
+    Creates the writer of the output file, writing only the Winners worksheet when the output file is the input file.
+    """
     if input_file == output_file:
-        output_workbook = openpyxl.load_workbook(input_file)
-        output_workbook.create_sheet("Winners")
-        output_worksheet = output_workbook["Winners"]
+        return PackageWriter(output_file, column_names)
+    elif engine == 'xlsxwriter':
+        return XlsxWriterWriter(output_file, column_names)
     else:
         output_workbook = Workbook()
-        output_worksheet = output_workbook.active
+        return OpenpyxlWriter(output_workbook, output_workbook.active, output_file, column_names)
 
-    for class_ in classes:
-        winners = find_winners(data, Series(data[column_names["class"]] == class_), False, break_tie=break_tie)
-        write_winners(output_worksheet, winners, class_, False)
+
+def write_results(writer: WinnersWriter, results: dict) -> None:
+    """
+    Writes the class placements, then the award winners, of the results of a calculation.
+    :param writer: the writer of the output file
+    :param results: a dictionary of the "classes", their "placements" and the "awards" as (award, winners) pairs
+    """
+    for class_ in results["classes"]:
+        writer.write_placements(class_, results["placements"].get(class_))
 
     # add headers for award winners
-    output_worksheet.append(['', column_names["number"], column_names["handler"], column_names["call name"]])
-    output_worksheet[f'B{output_worksheet.max_row}'].font = Font(bold=True)
-    output_worksheet[f'C{output_worksheet.max_row}'].font = Font(bold=True)
-    output_worksheet[f'D{output_worksheet.max_row}'].font = Font(bold=True)
+    writer.write_award_header()
+
+    for award, winners in results["awards"]:
+        writer.write_award(award, winners)
+
+
+def start_run(input_file: str, output_file: str, competition_type: str, engine: str = 'openpyxl',
+              progress: Callable[[str], None] = None, trace_memory: bool = False) -> tuple[RunReport, Callable]:
+    """
+    Checks the input file, the output file and the engine of a calculation before anything is read, then starts its
+    report.
+    :param input_file: the input .xlsx, .csv or .parquet file
+    :param output_file: the output file, if identical to input_file the winners are written to its Winners worksheet
+    :param competition_type: the type of competition, 'obedience' or 'rally'
+    :param engine: the library used to write a new output file, 'openpyxl' or 'xlsxwriter'
+    :param progress: called with each stage as it starts, may raise CalculationCancelled to stop the run
+    :param trace_memory: measure the peak memory of each stage with tracemalloc
+    :return: the run report, and a function that reports each stage as it starts to progress and to the run report
+    """
+    # make sure input file is valid
+    if os.path.splitext(input_file)[1].lower() not in SUPPORTED_EXTENSIONS:
+        raise TypeError("only .xlsx, .csv and .parquet are supported")
 
-    if competition_type == "obedience":
-        award_conditions = [
-            ("High in Trial (All Classes)", data[column_names["class"]].astype(str).str.contains(r".", case=False), False),
-            ("High Combined (Open B + Utility B)", ((data[column_names["class"]].astype(str).str.contains("open b", case=False)) |
-                               (data[column_names["class"]].astype(str).str.contains("utility b", case=False))), 2),
-            ("High Combined Preferred (Preferred Open + Preferred Utility)",
-             ((data[column_names["class"]].astype(str).str.contains("preferred open", case=False)) |
-              (data[column_names["class"]].astype(str).str.contains("preferred utility", case=False))), 2)
-        ]
-        if 'champion' in column_names:
-            award_conditions.append(
-                ("High Scoring Champion of Record", data[column_names["champion"]].astype(str).str.contains('Ch', na=False), False)
-            )
-
-    elif competition_type == "rally":
-        award_conditions = (
-            ("High Combined (Rally Excellent B + Rally Advanced B)", ((data[column_names["class"]].astype(str).str.contains(r"r(ally)? excellent b", case=False)) |
-                               (data[column_names["class"]].astype(str).str.contains(r"r(ally)? advanced? b", case=False))), 2),
-            ("High Triple (High Combined + Rally Master)", ((data[column_names["class"]].astype(str).str.contains(r"r(ally)? excellent b", case=False)) |
-                             (data[column_names["class"]].astype(str).str.contains(r"r(ally)? advanced? b", case=False)) |
-                             (data[column_names["class"]].astype(str).str.contains(r"r(ally)? master", case=False))), 3)
-        )
-    else:
-        raise ValueError("competition_type must be 'obedience' or 'rally'")
+    # check to see if file exists
+    if not os.path.exists(input_file):
+        raise FileNotFoundError("file not found")
 
-    # find award winners
-    for award, award_condition, combine_scores in award_conditions:
-        winners = find_winners(data, award_condition, True, combine_scores=combine_scores, break_tie=break_tie)
-        write_winners(output_worksheet, winners, award, True)
+    if engine not in ('openpyxl', 'xlsxwriter'):
+        raise ValueError("engine must be 'openpyxl' or 'xlsxwriter'")
 
-    if competition_type == "obedience":
-        groups = [group for group in data[column_names["group"]].unique() if str(group) != 'nan']  # find set of groups
+    if input_file == output_file:
+        if not input_file.lower().endswith('.xlsx'):
+            raise TypeError("only .xlsx files can be written to a new worksheet")
+        if engine == 'xlsxwriter':
+            raise ValueError("xlsxwriter can only write to a new file")
+
+    run_report = RunReport(input_file, output_file, competition_type, trace_memory=trace_memory)
+
+    def report(stage: str) -> None:
+        if progress is not None:
+            progress(stage)
+
+        run_report.start_stage(stage)
+
+    return run_report, report
+
+
+def calculate(input_file: str, output_file: str, competition_type: str, break_tie: bool = False,
+              engine: str = 'openpyxl', progress: Callable[[str], None] = None,
+              trace_memory: bool = False, use_cache: bool = False, database_file: str = None,
+              trial_date: str = None) -> RunReport:
+    """
+    Determines the winners of a dog show and writes them to the output file.
+    :param input_file: the input .xlsx, .csv or .parquet file
+    :param output_file: the output file, if identical to input_file the winners are written to its Winners worksheet,
+    replacing the one written by an earlier run
+    :param competition_type: the type of competition, 'obedience' or 'rally'
+    :param break_tie: break ties by class if possible
+    :param engine: the library used to write a new output file, 'openpyxl' or 'xlsxwriter'
+    :param progress: called with each stage in STAGES as it starts, may raise CalculationCancelled to stop the run
+    :param trace_memory: measure the peak memory of each stage with tracemalloc, which slows the calculation down
+    :param use_cache: reuse the results of an earlier run with the same input and settings, from the result cache
+    described by the settings
+    :param database_file: also store the cleaned contestants and the winners in this results database, see
+    ResultsDatabase
+    :param trial_date: the date of the trial stored in the results database as YYYY-MM-DD, defaults to the date the
+    input file was last modified
+    :return: a report of the time taken by each stage and the size of the trial, once the output file is saved
+    """
+    run_report, report = start_run(input_file, output_file, competition_type, engine, progress, trace_memory)
+
+    if trial_date is not None:
+        trial_date = datetime.date.fromisoformat(trial_date).isoformat()  # raises ValueError before anything is written
+    elif database_file is not None:
+        # read before the winners are written, which changes the modification time of an input file written in place
+        trial_date = datetime.date.fromtimestamp(os.path.getmtime(input_file)).isoformat()
 
-        # find group winners
-        for group in groups:
-            winners = find_winners(data, Series(data[column_names["group"]] == group), True, break_tie=break_tie)
-            write_winners(output_worksheet, winners, group, True)
+    # import settings
+    settings = load_settings()
+
+    try:
+        # read the needed columns
+        report("read")
+        data, column_names = read_contestants(input_file, competition_type)
+
+        # reuse the results of an earlier run with the same input and settings
+        result_cache = ResultCache.from_settings(settings) if use_cache else None
+        key = None if result_cache is None else cache_key(data, column_names, competition_type, break_tie,
+                                                          settings["class hierarchy"])
+        results = None if result_cache is None else result_cache.get(key)
+        run_report.cached = results is not None
+
+        if results is None:
+            results = calculate_results(data, column_names, competition_type, break_tie, settings["class hierarchy"],
+                                        report)
+            if result_cache is not None:
+                result_cache.put(key, results)
+
+        run_report.rows, run_report.classes = data.shape[0], len(results["classes"])
+        run_report.contestants, run_report.awards = results["contestants"].shape[0], len(results["awards"])
 
-    optimal_width(output_worksheet)
+        report("write")
+        writer = create_writer(input_file, output_file, engine, column_names)
+        write_results(writer, results)
 
-    output_workbook.save(output_file)
+        report("save")
+        writer.save()
 
-    return True
+        if database_file is not None:
+            with ResultsDatabase(database_file) as database:
+                database.store_trial(input_file, competition_type, break_tie, column_names, results, trial_date)
+    finally:
+        run_report.finish()
+
+    return run_report
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        sys.exit(importlib.import_module(SUBCOMMANDS[sys.argv[1]]).main(sys.argv[2:]))
+
     parser = argparse.ArgumentParser(description="Determine the winners of a dog show.")
-    parser.add_argument('input_file', type=open, help="the input .xlsx file")
+    parser.add_argument('input_file', type=open, help="the input .xlsx, .csv or .parquet file")
     parser.add_argument('output_file', help="the output file")
     parser.add_argument('competition_type', choices=['obedience', 'rally'], help="the type of competition")
     parser.add_argument('-n', '--no_ties', action='store_true', help="break ties by class if possible")
+    parser.add_argument('-e', '--engine', choices=['openpyxl', 'xlsxwriter'], default='openpyxl',
+                        help="the library used to write a new output file")
+    parser.add_argument('--profile', action='store_true',
+                        help="print the time and peak memory of each stage instead of 'Complete'")
+    parser.add_argument('--profile_output', help="write cProfile statistics of the calculation to this file")
+    parser.add_argument('--no_cache', action='store_true', help="don't reuse or store results in the result cache")
+    parser.add_argument('--clear_cache', action='store_true', help="clear the result cache before calculating")
+    parser.add_argument('--database', help="also store the contestants and winners in this results database")
+    parser.add_argument('--trial_date', help="the date of the trial in the results database, as YYYY-MM-DD")
+    parser.add_argument('--streaming', action='store_true',
+                        help="read the input in chunks, keeping only the candidates for each placement and award")
+    parser.add_argument('--chunk_rows', type=int, default=10000, help="the number of rows read at a time when streaming")
     args = parser.parse_args()
 
-    status = calculate(args.input_file.name, args.output_file, args.competition_type, args.no_ties)
+    if args.streaming and args.database:
+        parser.error("--database stores every contestant, it can't be used with --streaming")
+
+    if args.clear_cache:
+        result_cache = ResultCache.from_settings(load_settings())
+        if result_cache is not None:
+            result_cache.clear()
+
+    profiler = cProfile.Profile() if args.profile_output else None
+    if profiler is not None:
+        profiler.enable()
+
+    if args.streaming:
+        import streaming
+        status = streaming.calculate_streaming(args.input_file.name, args.output_file, args.competition_type,
+                                               args.no_ties, args.engine, trace_memory=args.profile,
+                                               chunk_rows=args.chunk_rows)
+    else:
+        status = calculate(args.input_file.name, args.output_file, args.competition_type, args.no_ties, args.engine,
+                           trace_memory=args.profile, use_cache=not args.no_cache, database_file=args.database,
+                           trial_date=args.trial_date)
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile_output)
 
-    if status:
+    if args.profile:
+        print(json.dumps(status.to_dict(), indent=2))
+    elif status:
         print("Complete")
     else:
         print(f"Unknown Error")
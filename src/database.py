@@ -0,0 +1,242 @@
+import os
+import sys
+import sqlite3
+import argparse
+import datetime
+from typing import Optional
+
+import pandas
+from pandas.core.frame import DataFrame
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY,
+    input_file TEXT NOT NULL,
+    trial_date TEXT NOT NULL,
+    competition_type TEXT NOT NULL,
+    break_tie INTEGER NOT NULL,
+    calculated_at TEXT NOT NULL,
+    UNIQUE (input_file, competition_type)
+);
+CREATE TABLE IF NOT EXISTS contestants (
+    trial_id INTEGER NOT NULL REFERENCES trials (id) ON DELETE CASCADE,
+    number TEXT,
+    handler TEXT,
+    call_name TEXT,
+    class TEXT,
+    score REAL NOT NULL,
+    pluses INTEGER NOT NULL,
+    "group" TEXT,
+    champion TEXT
+);
+CREATE TABLE IF NOT EXISTS awards (
+    trial_id INTEGER NOT NULL REFERENCES trials (id) ON DELETE CASCADE,
+    award TEXT NOT NULL,
+    place INTEGER,
+    number TEXT,
+    handler TEXT,
+    call_name TEXT,
+    class TEXT,
+    score REAL NOT NULL,
+    pluses INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trials_trial_date ON trials (trial_date);
+CREATE INDEX IF NOT EXISTS contestants_trial ON contestants (trial_id);
+CREATE INDEX IF NOT EXISTS contestants_call_name ON contestants (call_name);
+CREATE INDEX IF NOT EXISTS contestants_number ON contestants (number);
+CREATE INDEX IF NOT EXISTS contestants_class_score ON contestants (class, score);
+CREATE INDEX IF NOT EXISTS awards_trial ON awards (trial_id);
+CREATE INDEX IF NOT EXISTS awards_award ON awards (award, call_name);
+CREATE INDEX IF NOT EXISTS awards_call_name ON awards (call_name);
+"""
+
+# the columns of the contestants table, by the column name found by find_feature_names
+CONTESTANT_COLUMNS = {"number": "number", "handler": "handler", "call name": "call_name", "class": "class",
+                      "group": "group", "champion": "champion"}
+
+
+class ResultsDatabase:
+    """
+    A local SQLite database of the cleaned contestants and the winners of every calculated trial, for queries across a
+    season without reading the workbooks again. An input file calculated again replaces its earlier results.
+    """
+
+    def __init__(self, database_file: str):
+        # waits for other processes of a batch run that are storing their trials
+        self.connection = sqlite3.connect(database_file, timeout=60)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> 'ResultsDatabase':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def store_trial(self, input_file: str, competition_type: str, break_tie: bool, column_names: dict[str: str],
+                    results: dict, trial_date: str = None) -> int:
+        """
+        Stores the cleaned contestants and the winners of a trial in one transaction, replacing any earlier results of
+        the same input file and type of competition.
+        :param input_file: the input file of the trial
+        :param competition_type: the type of competition
+        :param break_tie: whether ties were broken by class
+        :param column_names: the column names found by find_feature_names
+        :param results: the results of the trial, with the cleaned "contestants", the class "placements" and the
+        "awards" as (award, winners) pairs
+        :param trial_date: the date of the trial as YYYY-MM-DD, defaults to the date the input file was last modified,
+        which must be read before the winners are written to an input file in place
+        :return: the id of the trial
+        """
+        input_file = os.path.abspath(input_file)
+        if trial_date is None:
+            trial_date = datetime.date.fromtimestamp(os.path.getmtime(input_file)).isoformat()
+        else:  # dates are compared as text, so they must be in one format
+            trial_date = datetime.date.fromisoformat(trial_date).isoformat()
+
+        with self.connection:
+            self.connection.execute("DELETE FROM trials WHERE input_file = ? AND competition_type = ?",
+                                    (input_file, competition_type))
+            trial_id = self.connection.execute(
+                "INSERT INTO trials (input_file, trial_date, competition_type, break_tie, calculated_at) "
+                "VALUES (?, ?, ?, ?, ?)", (input_file, trial_date, competition_type, int(break_tie),
+                                           datetime.datetime.now().isoformat(timespec='seconds'))).lastrowid
+
+            contestants = results["contestants"]
+            columns = [column for column in CONTESTANT_COLUMNS if column in column_names]
+            self.connection.executemany(
+                f"INSERT INTO contestants (trial_id, score, pluses, "
+                f"{', '.join(_quote(CONTESTANT_COLUMNS[column]) for column in columns)}) "
+                f"VALUES (?, ?, ?{', ?' * len(columns)})",
+                zip([trial_id] * contestants.shape[0], contestants[column_names["score"]].tolist(),
+                    contestants['Pluses'].tolist(),
+                    *(_text(contestants[column_names[column]]) for column in columns)))
+
+            winners = [(class_, place, row) for class_, placements in results["placements"].items()
+                       for place, row in enumerate(_winner_rows(placements, column_names), 1)]
+            winners += [(award, None, row) for award, award_winners in results["awards"]
+                        for row in _winner_rows(award_winners, column_names)]
+            self.connection.executemany(
+                "INSERT INTO awards (trial_id, award, place, number, handler, call_name, class, score, pluses) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((trial_id, str(award), place, *row) for award, place, row in winners))
+
+        return trial_id
+
+    def class_highs(self, since: str = None, until: str = None) -> DataFrame:
+        """
+        The highest score of each class, and who scored it first.
+        :param since: the first trial date to include, as YYYY-MM-DD
+        :param until: the last trial date to include, as YYYY-MM-DD
+        :return: a dataframe of class, score, pluses, call name, handler and trial date
+        """
+        where, parameters = _date_range(since, until)
+        return pandas.read_sql_query(
+            f"SELECT class, score, pluses, call_name, handler, trial_date FROM ("
+            f"  SELECT c.*, t.trial_date, ROW_NUMBER() OVER ("
+            f"    PARTITION BY c.class ORDER BY c.score DESC, c.pluses DESC, t.trial_date) AS position"
+            f"  FROM contestants c JOIN trials t ON t.id = c.trial_id WHERE c.class IS NOT NULL{where}"
+            f") WHERE position = 1 ORDER BY class", self.connection, params=parameters)
+
+    def award_counts(self, award: str, since: str = None, until: str = None) -> DataFrame:
+        """
+        How many times each dog won an award, most first.
+        :param award: the award name, SQL LIKE wildcards such as 'High Combined%' are allowed
+        :param since: the first trial date to include, as YYYY-MM-DD
+        :param until: the last trial date to include, as YYYY-MM-DD
+        :return: a dataframe of call name, handler and wins
+        """
+        where, parameters = _date_range(since, until)
+        return pandas.read_sql_query(
+            f"SELECT a.call_name, a.handler, COUNT(*) AS wins FROM awards a JOIN trials t ON t.id = a.trial_id "
+            f"WHERE a.award LIKE ?{where} GROUP BY a.call_name, a.handler ORDER BY wins DESC, a.call_name",
+            self.connection, params=[award] + parameters)
+
+    def award_leaders(self, award: str, since: str = None, until: str = None, limit: int = 10) -> DataFrame:
+        """
+        The best scores of an award, such as the combined scores of 'High Combined%'.
+        :param award: the award name, SQL LIKE wildcards are allowed
+        :param since: the first trial date to include, as YYYY-MM-DD
+        :param until: the last trial date to include, as YYYY-MM-DD
+        :param limit: the number of scores
+        :return: a dataframe of award, score, pluses, call name, handler and trial date, best first
+        """
+        where, parameters = _date_range(since, until)
+        return pandas.read_sql_query(
+            f"SELECT a.award, a.score, a.pluses, a.call_name, a.handler, t.trial_date FROM awards a "
+            f"JOIN trials t ON t.id = a.trial_id WHERE a.award LIKE ?{where} "
+            f"ORDER BY a.score DESC, a.pluses DESC, t.trial_date LIMIT ?",
+            self.connection, params=[award] + parameters + [limit])
+
+
+def _quote(column: str) -> str:
+    return f'"{column}"'
+
+
+def _text(values: pandas.Series) -> list[Optional[str]]:
+    """
+    Converts a column to text, with missing values as NULL.
+    """
+    return [None if pandas.isna(value) else str(value) for value in values.tolist()]
+
+
+def _winner_rows(winners: Optional[DataFrame], column_names: dict[str: str]) -> list[tuple]:
+    if winners is None or winners.shape[0] == 0:
+        return []
+
+    return list(zip(*(_text(winners[column_names[column]]) for column in ("number", "handler", "call name", "class")),
+                    winners[column_names["score"]].tolist(), winners['Pluses'].astype(int).tolist()))
+
+
+def _date_range(since: Optional[str], until: Optional[str]) -> tuple[str, list]:
+    where, parameters = "", []
+    if since is not None:
+        where += " AND t.trial_date >= ?"
+        parameters.append(since)
+    if until is not None:
+        where += " AND t.trial_date <= ?"
+        parameters.append(until)
+
+    return where, parameters
+
+
+def _date(value: str) -> str:
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {value}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="calculator.py database",
+                                     description="Query the results database across a season of trials.")
+    parser.add_argument('database_file', help="the results database")
+    parser.add_argument('query', choices=['highs', 'awards', 'leaders'],
+                        help="the highest score of each class, the award wins of each dog, or the best award scores")
+    parser.add_argument('-a', '--award', default="High in Trial%",
+                        help="the award of the awards and leaders queries, SQL LIKE wildcards are allowed")
+    parser.add_argument('--since', type=_date, help="the first trial date, as YYYY-MM-DD")
+    parser.add_argument('--until', type=_date, help="the last trial date, as YYYY-MM-DD")
+    parser.add_argument('-l', '--limit', type=int, default=10, help="the number of scores of the leaders query")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.database_file):
+        parser.error(f"database not found: {args.database_file}")
+
+    with ResultsDatabase(args.database_file) as database:
+        if args.query == 'highs':
+            result = database.class_highs(args.since, args.until)
+        elif args.query == 'awards':
+            result = database.award_counts(args.award, args.since, args.until)
+        else:
+            result = database.award_leaders(args.award, args.since, args.until, args.limit)
+
+    print(result.to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
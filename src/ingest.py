@@ -0,0 +1,247 @@
+import os
+from itertools import islice
+from typing import Iterator
+
+import numpy
+import pandas
+from pandas.core.frame import DataFrame
+
+import openpyxl
+
+SUPPORTED_EXTENSIONS = ('.xlsx', '.csv', '.parquet')
+
+
+def find_feature_names(column_keys: pandas.Index, competition_type: str) -> dict[str: str]:
+    feature_names = {}
+    column_keys = pandas.Index(column_keys)
+
+    # determine number column
+    column_matches = column_keys[column_keys.astype(str).str.match(r'.*number.*', case=False)]
+    if len(column_matches) == 1:
+        feature_names["number"] = column_matches[0]
+    elif len(column_matches) > 1:
+        raise KeyError("multiple 'number' columns detected")
+    else:
+        raise KeyError("no 'number' column detected")
+
+    # determine handler column
+    column_matches = column_keys[column_keys.astype(str).str.match(r'.*handler.*', case=False)]
+    if len(column_matches) == 1:
+        feature_names["handler"] = column_matches[0]
+    elif len(column_matches) > 1:
+        raise KeyError("multiple 'handler' columns detected")
+    else:
+        raise KeyError("no 'handler' column detected")
+
+    # determine call name column
+    column_matches = column_keys[column_keys.astype(str).str.match(r'.*call name.*', case=False)]
+    if len(column_matches) == 1:
+        feature_names["call name"] = column_matches[0]
+    elif len(column_matches) > 1:
+        raise KeyError("multiple 'call name' columns detected")
+    else:
+        raise KeyError("no 'call name' column detected")
+
+    # determine class column
+    column_matches = column_keys[column_keys.astype(str).str.match(r'.*class.*', case=False)]
+    if len(column_matches) == 1:
+        feature_names["class"] = column_matches[0]
+    elif len(column_matches) > 1:
+        raise KeyError("multiple 'class' columns detected")
+    else:
+        raise KeyError("no 'class' column detected")
+
+    # determine score column
+    column_matches = column_keys[column_keys.astype(str).str.match(r'.*score.*', case=False)]
+    if len(column_matches) == 1:
+        feature_names["score"] = column_matches[0]
+    elif len(column_matches) > 1:
+        raise KeyError("multiple 'score' columns detected")
+    else:
+        raise KeyError("no 'score' column detected")
+
+    if competition_type == 'obedience':
+        # determine champion column
+        column_matches = column_keys[column_keys.astype(str).str.match(r'.*champ.*', case=False)]
+        if len(column_matches) == 1:
+            feature_names["champion"] = column_matches[0]
+        elif len(column_matches) > 1:
+            raise KeyError("multiple 'champion' columns detected")
+
+        # determine group column
+        column_matches = column_keys[column_keys.astype(str).str.match(r'.*group.*', case=False)]
+        if len(column_matches) == 1:
+            feature_names["group"] = column_matches[0]
+        elif len(column_matches) > 1:
+            raise KeyError("multiple 'group' columns detected")
+        else:
+            raise KeyError("no 'group' column detected")
+
+    return feature_names
+
+
+def read_contestants(input_file: str, competition_type: str) -> tuple[DataFrame, dict]:
+    """
+    Reads the contestants from an .xlsx, .csv or .parquet file, loading only the columns found by find_feature_names.
+    :param input_file: the input file
+    :param competition_type: the type of competition
+    :return: a dataframe of contestants and the column names found by find_feature_names
+    """
+    extension = os.path.splitext(input_file)[1].lower()
+
+    if extension == '.csv':
+        column_names = find_feature_names(pandas.read_csv(input_file, nrows=0).columns, competition_type)
+        return pandas.read_csv(input_file, usecols=list(column_names.values())), column_names
+
+    elif extension == '.parquet':
+        import pyarrow.parquet  # optional dependency, only needed for parquet files
+
+        column_names = find_feature_names(pyarrow.parquet.read_schema(input_file).names, competition_type)
+        return pandas.read_parquet(input_file, columns=list(column_names.values())), column_names
+
+    elif extension == '.xlsx':
+        workbook = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+        try:
+            worksheet = workbook.worksheets[0]
+            worksheet.reset_dimensions()  # don't trust the stored dimensions, read until the last row
+            return _read_worksheet(worksheet, competition_type)
+        finally:
+            workbook.close()
+
+    else:
+        raise TypeError("only .xlsx, .csv and .parquet are supported")
+
+
+def read_worksheets(input_file: str, sheet_names: list[str] = None) -> dict[str: tuple[tuple, list[tuple]]]:
+    """
+    Reads the cell values of several worksheets of an .xlsx file in one pass over the workbook.
+    :param input_file: the input .xlsx file
+    :param sheet_names: the worksheets to read, in this order, or None for every worksheet in workbook order
+    :return: a dictionary of worksheet name to its header row and the rows below it
+    """
+    workbook = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+    try:
+        if sheet_names is None:
+            sheet_names = workbook.sheetnames
+        missing = [sheet_name for sheet_name in sheet_names if sheet_name not in workbook.sheetnames]
+        if missing:
+            raise KeyError(f"worksheet not found: {', '.join(missing)}")
+
+        worksheets = {}
+        for sheet_name in sheet_names:
+            worksheet = workbook[sheet_name]
+            worksheet.reset_dimensions()
+            rows = worksheet.iter_rows(values_only=True)
+            worksheets[sheet_name] = (next(rows, ()), list(rows))
+
+        return worksheets
+    finally:
+        workbook.close()
+
+
+def read_contestant_chunks(input_file: str, competition_type: str,
+                           chunk_rows: int = 10000) -> tuple[dict, Iterator[DataFrame]]:
+    """
+    Reads the contestants from an .xlsx, .csv or .parquet file in chunks of rows, so the whole file is never loaded
+    at once. Each chunk is indexed by its row numbers in the file, counting from 0 below the header.
+    :param input_file: the input file
+    :param competition_type: the type of competition
+    :param chunk_rows: the number of rows per chunk
+    :return: the column names found by find_feature_names and an iterator of dataframes of contestants
+    """
+    extension = os.path.splitext(input_file)[1].lower()
+
+    if extension == '.csv':
+        column_names = find_feature_names(pandas.read_csv(input_file, nrows=0).columns, competition_type)
+        return column_names, iter(pandas.read_csv(input_file, usecols=list(column_names.values()),
+                                                  chunksize=chunk_rows))
+
+    elif extension == '.parquet':
+        import pyarrow.parquet  # optional dependency, only needed for parquet files
+
+        parquet_file = pyarrow.parquet.ParquetFile(input_file)
+        column_names = find_feature_names(parquet_file.schema_arrow.names, competition_type)
+        batches = (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=chunk_rows,
+                                                                            columns=list(column_names.values())))
+        return column_names, _number_rows(batches)
+
+    elif extension == '.xlsx':
+        workbook = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+        try:
+            worksheet = workbook.worksheets[0]
+            worksheet.reset_dimensions()
+            rows = worksheet.iter_rows(values_only=True)
+            column_names, indices = _find_columns(next(rows, ()), competition_type)
+        except BaseException:
+            workbook.close()
+            raise
+
+        return column_names, _number_rows(_worksheet_chunks(workbook, rows, column_names, indices, chunk_rows))
+
+    else:
+        raise TypeError("only .xlsx, .csv and .parquet are supported")
+
+
+def read_rows(header: tuple, rows, competition_type: str) -> tuple[DataFrame, dict]:
+    """
+    Reads the needed columns from rows of cell values.
+    :param header: the header row
+    :param rows: an iterable of the rows below the header
+    :param competition_type: the type of competition
+    :return: a dataframe of contestants and the column names found by find_feature_names
+    """
+    column_names, indices = _find_columns(header, competition_type)
+
+    return _rows_frame(rows, column_names, indices), column_names
+
+
+def _find_columns(header: tuple, competition_type: str) -> tuple[dict, list[int]]:
+    """
+    Finds the needed columns of a header row.
+    :return: the column names found by find_feature_names and the position of each in the row
+    """
+    header = [f"Unnamed: {i}" if key is None else key for i, key in enumerate(header)]
+
+    column_names = find_feature_names(header, competition_type)
+    return column_names, [header.index(column) for column in column_names.values()]
+
+
+def _rows_frame(rows, column_names: dict[str: str], indices: list[int]) -> DataFrame:
+    contestants = [[row[i] if i < len(row) else None for i in indices] for row in rows]
+
+    return DataFrame(contestants, columns=list(column_names.values())).fillna(numpy.nan)
+
+
+def _worksheet_chunks(workbook, rows, column_names: dict[str: str], indices: list[int],
+                      chunk_rows: int) -> Iterator[DataFrame]:
+    """
+    Reads the rows of a read only worksheet in chunks, closing its workbook once done.
+    """
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                return
+            yield _rows_frame(chunk, column_names, indices)
+    finally:
+        workbook.close()
+
+
+def _number_rows(chunks: Iterator[DataFrame]) -> Iterator[DataFrame]:
+    """
+    Indexes each chunk by its row numbers in the file.
+    """
+    start = 0
+    for chunk in chunks:
+        chunk.index = pandas.RangeIndex(start, start + chunk.shape[0])
+        start += chunk.shape[0]
+        yield chunk
+
+
+def _read_worksheet(worksheet, competition_type: str) -> tuple[DataFrame, dict]:
+    """
+    Reads the needed columns of a worksheet row by row, the first row being the header.
+    :return: a dataframe of contestants and the column names
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    return read_rows(next(rows, ()), rows, competition_type)
@@ -1,11 +1,112 @@
 import sys
 import os
 import json
+import time
 from PyQt5.QtWidgets import *
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal, pyqtSlot
 from PyQt5.QtGui import QIcon
 
-from calculator import calculate
+STAGE_NAMES = {"read": "Reading", "clean": "Cleaning", "rank": "Ranking", "awards": "Finding awards",
+               "write": "Writing", "save": "Saving"}
+
+
+class WorkerSignals(QObject):
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(bool)
+    cancelled = pyqtSignal()
+    error = pyqtSignal(str)
+
+
+class PreloadWorker(QRunnable):
+    """
+    Imports the calculation stack (pandas and openpyxl) in the background, so the window shows before it is loaded.
+    """
+
+    @pyqtSlot()
+    def run(self) -> None:
+        import calculator  # noqa: F401
+
+
+class CalculationWorker(QRunnable):
+    """
+    Runs a calculation on a thread pool thread, reporting each stage through its signals.
+    """
+
+    def __init__(self, input_file: str, output_file: str, competition_type: str, break_tie: bool):
+        super(CalculationWorker, self).__init__()
+        self.input_file = input_file
+        self.output_file = output_file
+        self.competition_type = competition_type
+        self.break_tie = break_tie
+        self.is_cancelled = False
+        self.signals = WorkerSignals()
+
+    def cancel(self) -> None:
+        """
+        Stops the calculation before its next stage. A file that is already being saved is still saved.
+        """
+        self.is_cancelled = True
+
+    def report(self, stage: str) -> None:
+        from calculator import CalculationCancelled
+
+        if self.is_cancelled:
+            raise CalculationCancelled("cancelled")
+
+        self.signals.progress.emit(stage)
+
+    @pyqtSlot()
+    def run(self) -> None:
+        if self.is_cancelled:  # cancelled while queued
+            self.signals.cancelled.emit()
+            return
+
+        import calculator  # already loaded by the PreloadWorker, unless it is still loading
+
+        try:
+            status = calculator.calculate(self.input_file, self.output_file, self.competition_type, self.break_tie,
+                                          progress=self.report, use_cache=True)
+        except calculator.CalculationCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.error.emit(str(e.args[-1]) if e.args else type(e).__name__)
+        else:
+            self.signals.finished.emit(bool(status))
+
+
+class WatchWorker(QRunnable):
+    """
+    Updates the results of a watched trial on a thread pool thread. The first update starts the watcher, so the
+    calculation stack is never loaded on the GUI thread.
+    """
+
+    def __init__(self, watcher=None, watch_arguments: tuple = ()):
+        super(WatchWorker, self).__init__()
+        self.watcher = watcher
+        self.watch_arguments = watch_arguments  # the arguments of the TrialWatcher to start, if there is no watcher
+        self.update = None
+        self.is_cancelled = False
+        self.signals = WorkerSignals()
+
+    def cancel(self) -> None:
+        self.is_cancelled = True
+
+    @pyqtSlot()
+    def run(self) -> None:
+        if self.is_cancelled:
+            self.signals.cancelled.emit()
+            return
+
+        try:
+            if self.watcher is None:
+                from watch import TrialWatcher  # already loaded by the PreloadWorker, unless it is still loading
+
+                self.watcher = TrialWatcher(*self.watch_arguments)
+            self.update = self.watcher.update()
+        except Exception as e:
+            self.signals.error.emit(str(e.args[-1]) if e.args else type(e).__name__)
+        else:
+            self.signals.finished.emit(True)
 
 
 class MainWindow(QWidget):
@@ -14,6 +115,17 @@ class MainWindow(QWidget):
 
         self.output_overridden = False
 
+        # runs are queued and calculated one at a time, off the event loop thread, behind the preload
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        self.workers = []
+
+        # while watching, the input file is checked for saves on the event loop, updates run on the thread pool
+        self.watcher = None
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setInterval(250)
+        self.watch_timer.timeout.connect(self.watch_poll)
+
         # import settings
         if not os.path.exists("settings.json"):
             with open("settings.json", 'w') as f:
@@ -70,6 +182,13 @@ class MainWindow(QWidget):
         # remaining widgets
         calculate_button = QPushButton('Calculate')
         calculate_button.clicked.connect(self.calculate_function)
+        self.cancel_button = QPushButton('Cancel')
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_function)
+        self.watch_button = QPushButton('Watch')
+        self.watch_button.setCheckable(True)
+        self.watch_button.setToolTip("Update the output file each time the input file is saved")
+        self.watch_button.toggled.connect(self.watch_toggled)
         self.status_field = QLabel("Status: Idle")
         self.status_field.setAlignment(Qt.AlignCenter)
 
@@ -81,6 +200,8 @@ class MainWindow(QWidget):
         layout.addWidget(options_box)
         status_layout = QHBoxLayout()
         status_layout.addWidget(calculate_button)
+        status_layout.addWidget(self.cancel_button)
+        status_layout.addWidget(self.watch_button)
         status_layout.addWidget(self.status_field)
         layout.addLayout(status_layout)
 
@@ -92,6 +213,12 @@ class MainWindow(QWidget):
         self.setWindowIcon(QIcon("trip.ico"))
         self.setGeometry(100, 100, 128 * 3, 0)
 
+    def preload(self) -> None:
+        """
+        Starts loading the calculation stack in the background, any calculation is queued behind it.
+        """
+        self.thread_pool.start(PreloadWorker())
+
     def select_file(self) -> None:
         """
         Opens a window to allow the user to select a file, then updates the output field.
@@ -118,9 +245,14 @@ class MainWindow(QWidget):
             if not self.output_overridden:
                 input_file = self.input_file_field.text().rsplit('.', 1)
                 if len(input_file) > 1:
-                    self.output_file_field.setText(f"{input_file[0]}_scores.{input_file[1]}")
+                    self.output_file_field.setText(f"{input_file[0]}_scores.xlsx")
         else:
-            self.output_file_field.setText(self.input_file_field.text())
+            # only .xlsx files have worksheets to write to, any other input file gets a new file next to it
+            stem, extension = os.path.splitext(self.input_file_field.text())
+            if extension and extension.lower() != '.xlsx':
+                self.output_file_field.setText(f"{stem}_scores.xlsx")
+            else:
+                self.output_file_field.setText(self.input_file_field.text())
 
     def output_manually_changed(self) -> None:
         """
@@ -130,7 +262,7 @@ class MainWindow(QWidget):
 
     def calculate_function(self) -> None:
         """
-        Calculates the scores of the input file and updates the status in the window.
+        Queues a calculation of the scores of the input file, its status is updated in the window as it runs.
         """
         if not self.obedience_button.isChecked() and not self.rally_button.isChecked():
             self.status_field.setText(f"Error: Competition type required")
@@ -140,17 +272,106 @@ class MainWindow(QWidget):
         else:
             competition_type = "rally"
 
-        self.status_field.setText("Status: Calculating")
-        try:
-            status = calculate(self.input_file_field.text(), self.output_file_field.text(), competition_type)
+        worker = CalculationWorker(self.input_file_field.text(), self.output_file_field.text(), competition_type,
+                                   self.return_multiple_away_winners.isChecked())
+        worker.signals.progress.connect(lambda stage: self.worker_progress(worker, stage))
+        worker.signals.finished.connect(lambda status: self.worker_finished(worker, "Status: Complete" if status
+                                                                            else "Error: Unknown"))
+        worker.signals.cancelled.connect(lambda: self.worker_finished(worker, "Status: Cancelled"))
+        worker.signals.error.connect(lambda message: self.worker_finished(worker, f"Error: {message}"))
+
+        self.workers.append(worker)
+        self.cancel_button.setEnabled(True)
+        if len(self.workers) > 1:
+            self.status_field.setText(f"Status: {len(self.workers) - 1} queued")
+        else:
+            self.status_field.setText("Status: Calculating")
+
+        self.thread_pool.start(worker)
+
+    def watch_toggled(self, checked: bool) -> None:
+        """
+        Starts or stops watching the input file, the output file is updated each time the input file is saved.
+        """
+        if not checked:
+            self.watch_timer.stop()
+            self.watcher = None
+            self.status_field.setText("Status: Idle")
+            return
+
+        if not self.obedience_button.isChecked() and not self.rally_button.isChecked():
+            self.status_field.setText(f"Error: Competition type required")
+            self.watch_button.setChecked(False)
+            return
+
+        watch_arguments = (self.input_file_field.text(), self.output_file_field.text(),
+                           "obedience" if self.obedience_button.isChecked() else "rally",
+                           self.return_multiple_away_winners.isChecked())
+        self.queue_watch_update(WatchWorker(watch_arguments=watch_arguments))
+        self.watch_timer.start()
+
+    def watch_poll(self) -> None:
+        if self.watcher is not None and not self.workers and self.watcher.poll():
+            self.queue_watch_update(WatchWorker(self.watcher))
+
+    def queue_watch_update(self, worker: WatchWorker) -> None:
+        worker.signals.finished.connect(lambda _: self.watch_finished(worker, self.watch_status(worker.update)))
+        worker.signals.cancelled.connect(lambda: self.watch_finished(worker, "Status: Cancelled"))
+        worker.signals.error.connect(lambda message: self.watch_finished(worker, f"Error: {message}"))
+
+        self.workers.append(worker)
+        self.cancel_button.setEnabled(True)
+        self.status_field.setText("Status: Updating")
+        self.thread_pool.start(worker)
 
-            if status:
-                self.status_field.setText("Status: Complete")
+    def watch_finished(self, worker: WatchWorker, status: str) -> None:
+        """
+        Keeps the watcher started by the first update, or stops watching if it could not be started.
+        """
+        if self.watch_button.isChecked():
+            if worker.watcher is None:
+                self.watch_button.setChecked(False)
             else:
-                self.status_field.setText(f"Error: Unknown")
+                self.watcher = worker.watcher
 
-        except Exception as e:
-            self.status_field.setText(f"Error: {e.args[-1]}")
+        self.worker_finished(worker, status)
+
+    @staticmethod
+    def watch_status(update) -> str:
+        changed = len(update.changed_classes)
+        return f"Status: Updated {changed} class{'es' if changed != 1 else ''} at {time.strftime('%H:%M:%S')}"
+
+    def cancel_function(self) -> None:
+        """
+        Cancels the running calculation and any queued calculations.
+        """
+        for worker in self.workers:
+            worker.cancel()
+
+        self.status_field.setText("Status: Cancelling")
+
+    def worker_progress(self, worker: CalculationWorker, stage: str) -> None:
+        """
+        Shows the stage of the running calculation, and how many calculations are queued behind it.
+        """
+        if worker.is_cancelled:
+            return
+
+        status = f"Status: {STAGE_NAMES.get(stage, stage)}"
+        if len(self.workers) > 1:
+            status += f" ({len(self.workers) - 1} queued)"
+
+        self.status_field.setText(status)
+
+    def worker_finished(self, worker: CalculationWorker, status: str) -> None:
+        """
+        Shows the final status of a calculation, unless more calculations are still to come.
+        """
+        self.workers.remove(worker)
+        self.cancel_button.setEnabled(len(self.workers) > 0)
+
+        if not self.workers or status.startswith("Error"):
+            self.status_field.setText(status)
 
 
 if __name__ == '__main__':
@@ -158,4 +379,5 @@ if __name__ == '__main__':
     app.setStyle('Fusion')
     window = MainWindow()
     window.show()
+    QTimer.singleShot(0, window.preload)  # once the window is shown
     app.exec_()
@@ -0,0 +1,258 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy
+import pandas
+from pandas.core.frame import DataFrame
+from pandas.core.series import Series
+
+# bumped whenever the placement or award rules change the results, so results found by older rules are never reused:
+# 2 - preferred classes count toward High Combined Preferred
+RESULTS_VERSION = 2
+
+# patterns used to sort class names into the categories awards are based on, matched case-insensitively
+CLASS_CATEGORIES = {
+    "all": r".",
+    "beginner": r"begin",
+    "preferred": r"preferred",
+    "open b": r"open b",
+    "utility b": r"utility b",
+    "preferred open": r"preferred open",
+    "preferred utility": r"preferred utility",
+    "rally excellent b": r"r(?:ally)? excellent b",
+    "rally advanced b": r"r(?:ally)? advanced? b",
+    "rally master": r"r(?:ally)? master",
+}
+
+
+# a score is a number, optionally followed by '+' tie breakers, anything else such as 'AB' or 'NQ' is not a score
+SCORE_PATTERN = r'^(\d[\d.]*)\s*(\+*)'
+
+# sort keys pack score, class rank and pluses into one integer, scores are kept to hundredths of a point
+SCORE_SCALE = 100
+PLUS_LIMIT = 16  # pluses beyond 15 all sort the same
+
+
+def class_category_index(classes: Series) -> DataFrame:
+    """
+    Classifies every distinct class name once, then maps the categories back to the contestants by their class codes.
+    :param classes: the class column of the contestants
+    :return: a boolean dataframe with a column per category in CLASS_CATEGORIES, aligned with classes
+    """
+    codes, distinct_classes = pandas.factorize(classes.astype(str))
+    distinct_classes = Series(distinct_classes, dtype=object)
+
+    categories = DataFrame({category: distinct_classes.str.contains(pattern, case=False).to_numpy(dtype=bool)
+                            for category, pattern in CLASS_CATEGORIES.items()})
+
+    return DataFrame(categories.to_numpy()[codes], index=classes.index, columns=categories.columns)
+
+
+def award_eligible(categories: DataFrame) -> Series:
+    """
+    Beginner and preferred classes are not eligible for awards.
+    :param categories: the class category index of the contestants
+    :return: a boolean series of the contestants eligible for awards
+    """
+    return ~(categories["beginner"] | categories["preferred"])
+
+
+@lru_cache(maxsize=None)
+def compile_class_hierarchy(class_hierarchy: tuple[str, ...]) -> tuple[tuple[re.Pattern, int], ...]:
+    """
+    Compiles the class hierarchy from the settings into patterns paired with their class ranks. Cached, so the
+    hierarchy is only compiled once per process.
+    :param class_hierarchy: the class hierarchy, highest class first
+    :return: a tuple of (compiled pattern, class rank), highest class first
+    """
+    return tuple((re.compile(class_.lower()), len(class_hierarchy) - rank) for rank, class_ in enumerate(class_hierarchy))
+
+
+def class_ranks(classes: Series, class_hierarchy: list[str]) -> Series:
+    """
+    Ranks every distinct class name once by the first class in the hierarchy it contains, then maps the ranks back to
+    the contestants by their class codes. Classes not in the hierarchy are ranked last, with a rank of 0.
+    :param classes: the class column of the contestants
+    :param class_hierarchy: the class hierarchy, highest class first
+    :return: a series of class ranks, aligned with classes
+    """
+    hierarchy = compile_class_hierarchy(tuple(class_hierarchy))
+    codes, distinct_classes = pandas.factorize(classes.astype(str).str.lower())
+
+    distinct_ranks = numpy.array([next((rank for pattern, rank in hierarchy if pattern.search(class_)), 0)
+                                  for class_ in distinct_classes], dtype=int)
+
+    return Series(distinct_ranks[codes], index=classes.index)
+
+
+def parse_scores(scores: Series) -> DataFrame:
+    """
+    Parses scores with '+' tie breakers, such as '197+', in one pass.
+    :param scores: the score column of the contestants
+    :return: a dataframe of the base score as a float and the count of pluses, with a score of NaN for entries that are
+    not scores, aligned with scores
+    """
+    parts = scores.astype(str).str.extract(SCORE_PATTERN)
+
+    return DataFrame({"score": parts[0].astype(float), "pluses": parts[1].str.len().fillna(0).astype(int)},
+                     index=scores.index)
+
+
+def sort_keys(scores: Series, class_ranks: Series, pluses: Series, class_hierarchy: list[str]) -> Series:
+    """
+    Packs score, class rank and pluses into one integer, so contestants are ranked by a single integer sort, and
+    compared by a single integer comparison.
+    :param scores: the base scores of the contestants
+    :param class_ranks: the class ranks of the contestants, found by class_ranks
+    :param pluses: the pluses of the contestants
+    :param class_hierarchy: the class hierarchy the class ranks are based on
+    :return: a series of int64 sort keys, larger is better, aligned with scores
+    """
+    rank_limit = len(class_hierarchy) + 1
+    keys = numpy.rint(scores.to_numpy(dtype=float) * SCORE_SCALE).astype(numpy.int64)
+    keys = (keys * rank_limit + class_ranks.to_numpy()) * PLUS_LIMIT + numpy.minimum(pluses.to_numpy(), PLUS_LIMIT - 1)
+
+    return Series(keys, index=scores.index)
+
+
+def sort_contestants(contestants: DataFrame) -> DataFrame:
+    """
+    Sorts the contestants once, best first, by their sort key. Ties keep their entry order.
+    :param contestants: a dataframe of cleaned contestants
+    :return: a sorted dataframe of contestants
+    """
+    return contestants.iloc[numpy.argsort(-contestants['Sort Key'].to_numpy(), kind='stable')]
+
+
+def class_placements(ranked: DataFrame, column_names: dict[str: str], places: int = 4) -> dict:
+    """
+    Finds the top placements of every class in one grouped pass.
+    :param ranked: a dataframe of contestants sorted by sort_contestants
+    :param column_names: the column names found by find_feature_names
+    :param places: the number of placements per class
+    :return: a dictionary of class to a dataframe of its winners, in placement order
+    """
+    placements = ranked.groupby(column_names["class"], sort=False).head(places)
+
+    return {class_: winners for class_, winners in placements.groupby(column_names["class"], sort=False)}
+
+
+def group_highs(ranked: DataFrame, column_names: dict[str: str], eligible: Series, break_tie: bool = False) -> dict:
+    """
+    Finds the high scoring contestants of every group in one grouped pass.
+    :param ranked: a dataframe of contestants sorted by sort_contestants
+    :param column_names: the column names found by find_feature_names
+    :param eligible: a boolean series of the contestants eligible for awards
+    :param break_tie: break ties by class if possible
+    :return: a dictionary of group to a dataframe of its winners, in entry order
+    """
+    eligible = ranked.loc[eligible]
+
+    # the highest scores in each group
+    groups = eligible.groupby(column_names["group"], sort=False)
+    highs = eligible.loc[eligible[column_names["score"]] == groups[column_names["score"]].transform('max')]
+    high_groups = highs.groupby(column_names["group"], sort=False)
+
+    if break_tie:  # break tie by class, the first contestant of each group has the best sort key
+        winners = highs.loc[highs['Sort Key'] == high_groups['Sort Key'].transform('first')]
+    else:
+        # if there is more than one class, don't break by pluses
+        multiple_classes = high_groups[column_names["class"]].transform('nunique', dropna=False) > 1
+        winners = highs.loc[multiple_classes | (highs['Pluses'] == high_groups['Pluses'].transform('max'))]
+
+    return {group: group_winners.sort_index()
+            for group, group_winners in winners.groupby(column_names["group"], sort=False)}
+
+
+@dataclass(frozen=True)
+class CombinedAward:
+    """
+    An award for the highest sum of a contestant's best score in each of its class categories, with an entry needed in
+    every one. Beginner classes never count, and preferred classes only count toward a preferred award, which only
+    counts preferred classes.
+    """
+    categories: tuple[str, ...]
+    preferred: bool = False
+
+    @property
+    def columns(self) -> list[tuple[str, bool]]:
+        """
+        The (category, preferred) columns of the score matrix this award combines.
+        """
+        return [(category, self.preferred) for category in self.categories]
+
+
+def combined_columns(combined_awards: dict[str: CombinedAward]) -> list[tuple[str, bool]]:
+    """
+    The distinct (category, preferred) columns of every combined award, in order.
+    """
+    return list(dict.fromkeys(column for combined_award in combined_awards.values()
+                              for column in combined_award.columns))
+
+
+def combined_category_index(categories: DataFrame, columns: list[tuple[str, bool]]) -> DataFrame:
+    """
+    Finds the entries that count toward each class category of the combined awards. Beginner classes never count,
+    preferred classes only count toward the categories of a preferred award, and regular classes toward the rest.
+    :param categories: the class category index of the contestants
+    :param columns: the (category, preferred) columns of the combined awards, see combined_columns
+    :return: a boolean dataframe with a column per (category, preferred) pair, aligned with categories
+    """
+    regular = ~categories["beginner"] & ~categories["preferred"]
+    preferred = ~categories["beginner"] & categories["preferred"]
+    return DataFrame({(category, is_preferred): categories[category] & (preferred if is_preferred else regular)
+                      for category, is_preferred in columns}, index=categories.index)
+
+
+def combined_winners(ranked: DataFrame, column_names: dict[str: str], categories: DataFrame,
+                     combined_awards: dict[str: CombinedAward], break_tie: bool = False) -> dict:
+    """
+    Finds the winners of every combined score award from one call name by class category score matrix. A contestant
+    needs a score in each class category of an award, their combined score is the sum of their best score in each.
+    :param ranked: a dataframe of contestants sorted by sort_contestants
+    :param column_names: the column names found by find_feature_names
+    :param categories: the class category index of the contestants
+    :param combined_awards: a dictionary of award name to the combined award
+    :param break_tie: break ties by class if possible
+    :return: a dictionary of award name to a dataframe of its winners, each represented by their best entry of the
+    award with the combined score
+    """
+    columns = combined_columns(combined_awards)
+    categories = combined_category_index(categories, columns).loc[ranked.index]
+    entries_mask = categories.any(axis=1).to_numpy()
+    entries = ranked.loc[entries_mask]
+    categories = categories.loc[entries_mask]
+
+    # the call name by category matrices of the best score and the position of the best entry of each contestant
+    call_names = entries[column_names["call name"]].to_numpy()
+    scores = entries[column_names["score"]]
+    positions = Series(numpy.arange(entries.shape[0], dtype=float), index=entries.index)
+    best_scores = DataFrame({column: scores.where(categories[column]) for column in columns}).groupby(
+        call_names, sort=False).max()
+    first_positions = DataFrame({column: positions.where(categories[column]) for column in columns}).groupby(
+        call_names, sort=False).min()
+
+    winners = {}
+    for award, combined_award in combined_awards.items():
+        award_columns = combined_award.columns
+        totals = best_scores[award_columns].sum(axis=1).where(best_scores[award_columns].notna().all(axis=1))
+        if totals.isna().all():
+            winners[award] = entries.iloc[:0]
+            continue
+
+        # contestants tied for the best combined score, in order of their best entry
+        tied = first_positions.loc[totals == totals.max(), award_columns].min(axis=1).sort_values(kind='stable')
+
+        if break_tie and tied.shape[0] > 1:
+            tied_entries = entries.loc[categories[award_columns].any(axis=1).to_numpy() &
+                                       entries[column_names["call name"]].isin(tied.index).to_numpy()]
+            first = tied_entries.sort_values(['Class Rank', column_names["score"], 'Pluses'], ascending=False,
+                                             kind='stable')[column_names["call name"]].iloc[0]
+            tied = tied.loc[[first]]
+
+        award_winners = entries.iloc[tied.to_numpy().astype(int)].copy()
+        award_winners[column_names["score"]] = totals.max()
+        winners[award] = award_winners
+
+    return winners
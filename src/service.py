@@ -0,0 +1,328 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from typing import Iterable, Optional
+from urllib.parse import urlsplit, parse_qs
+
+import numpy
+import pandas
+from pandas.core.frame import DataFrame
+
+from openpyxl import Workbook
+
+from calculator import load_settings, calculate_results, write_results
+from ingest import find_feature_names, read_contestants
+from writer import OpenpyxlWriter
+
+HOST = "127.0.0.1"  # the service is only reachable from the machine it runs on
+MAX_HEADER_BYTES = 64 * 1024
+READ_TIMEOUT = 30.0
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# the file extension read_contestants reads each uploaded content type as
+UPLOAD_EXTENSIONS = {XLSX_CONTENT_TYPE: '.xlsx', "text/csv": '.csv', "application/vnd.apache.parquet": '.parquet'}
+
+
+class RequestError(Exception):
+    """
+    Raised while handling a request to answer it with an error status.
+    """
+
+    def __init__(self, status: HTTPStatus, message: str, unread: int = 0):
+        super().__init__(message)
+        self.status = status
+        self.unread = unread  # the bytes of the body still to be discarded after answering
+
+
+def _warm_up() -> int:
+    """
+    Runs in each worker process as it starts, so the first job doesn't wait for pandas and openpyxl to load.
+    """
+    import calculator  # noqa: F401
+
+    return os.getpid()
+
+
+def _winners_json(winners: Optional[DataFrame], column_names: dict[str: str]) -> list[dict]:
+    """
+    Converts winners to a list of number, handler, call name and display score, as written to the Winners worksheet.
+    """
+    if winners is None:
+        return []
+
+    return [{"number": number, "handler": handler, "call name": call_name,
+             "score": f"{int(score)}{'+' * int(pluses)}"}
+            for number, handler, call_name, score, pluses in zip(
+                *(_json_values(winners[column_names[column]]) for column in ("number", "handler", "call name")),
+                winners[column_names["score"]].tolist(), winners['Pluses'].tolist())]
+
+
+def _json_values(values: Iterable) -> list:
+    """
+    Converts values to ones json can write, with missing values as None and numpy scalars, which object columns such as
+    a numeric Group keep, as the equal Python values.
+    """
+    return [None if pandas.isna(value) else value.item() if isinstance(value, numpy.generic) else value
+            for value in list(values)]
+
+
+def run_job(body: bytes, content_type: str, competition_type: str, break_tie: bool, output_format: str,
+            class_hierarchy: list[str]) -> bytes:
+    """
+    Calculates the winners of an uploaded trial, in a worker process.
+    :param body: the uploaded file, or a JSON list of contestants keyed by column name
+    :param content_type: the content type of the upload, see UPLOAD_EXTENSIONS, or application/json
+    :param competition_type: the type of competition, 'obedience' or 'rally'
+    :param break_tie: break ties by class if possible
+    :param output_format: 'json' for the class placements and awards as JSON, or 'xlsx' for the Winners workbook
+    :param class_hierarchy: the class hierarchy from the settings
+    :return: the response body
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        if content_type == "application/json":
+            contestants = json.loads(body)
+            if isinstance(contestants, dict):
+                contestants = contestants.get("contestants")
+            if not isinstance(contestants, list) or not all(isinstance(row, dict) for row in contestants):
+                raise ValueError("expected a list of contestants, each an object keyed by column name")
+
+            data = DataFrame(contestants)
+            column_names = find_feature_names(data.columns, competition_type)
+            data = data[list(column_names.values())].fillna(numpy.nan)  # missing values as read from a file
+        else:
+            input_file = os.path.join(directory, "input" + UPLOAD_EXTENSIONS[content_type])
+            with open(input_file, 'wb') as f:
+                f.write(body)
+            data, column_names = read_contestants(input_file, competition_type)
+
+        results = calculate_results(data, column_names, competition_type, break_tie, class_hierarchy)
+
+        if output_format == 'xlsx':
+            output_file = os.path.join(directory, "winners.xlsx")
+            output_workbook = Workbook()
+            writer = OpenpyxlWriter(output_workbook, output_workbook.active, output_file, column_names)
+            write_results(writer, results)
+            writer.save()
+            with open(output_file, 'rb') as f:
+                return f.read()
+
+    awards = results["awards"]
+    return json.dumps({
+        "rows": data.shape[0],
+        "contestants": results["contestants"].shape[0],
+        "classes": [{"class": name, "placements": _winners_json(results["placements"].get(class_), column_names)}
+                    for class_, name in zip(results["classes"], _json_values(results["classes"]))],
+        "awards": [{"award": name, "winners": _winners_json(winners, column_names)}
+                   for name, (_, winners) in zip(_json_values(award for award, _ in awards), awards)],
+    }).encode()
+
+
+class ScoringService:
+    """
+    A long-running local HTTP service that calculates the winners of uploaded trials on a bounded pool of worker
+    processes, which keep pandas and openpyxl loaded between jobs. Jobs beyond the workers wait in a queue of bounded
+    length, and requests beyond that are turned away with 503 until the queue drains.
+
+    POST /calculate?competition_type=obedience&break_tie=1&format=json takes an .xlsx, .csv or .parquet upload by its
+    content type, or a JSON list of contestants, and answers with the results as JSON, or as the Winners workbook with
+    format=xlsx. GET /status answers with the number of workers and of running and queued jobs.
+    """
+
+    def __init__(self, port: int = 8765, workers: int = None, max_queue: int = 32,
+                 max_upload_megabytes: float = 64):
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.max_upload_bytes = int(max_upload_megabytes * 1024 * 1024)
+        self.class_hierarchy = load_settings()["class hierarchy"]
+        self.jobs = 0  # jobs running or queued
+        self.executor = None
+        self.server = None
+
+    async def start(self) -> None:
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        # start every worker up front, so no request pays for a worker starting
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_up) for _ in range(self.workers)))
+
+        self.server = await asyncio.start_server(self.handle, HOST, self.port, limit=MAX_HEADER_BYTES)
+        self.port = self.server.sockets[0].getsockname()[1]  # the port chosen by the system, if given 0
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Answers one request per connection.
+        """
+        unread = 0
+        try:
+            try:
+                method, target, headers, body = await asyncio.wait_for(self._read_request(reader), READ_TIMEOUT)
+                status, content_type, response = await self._dispatch(method, target, headers, body)
+            except RequestError as e:
+                status, content_type, response = e.status, "application/json", _error_body(e)
+                unread = e.unread
+            except asyncio.TimeoutError:
+                status, content_type, response = HTTPStatus.REQUEST_TIMEOUT, "application/json", \
+                    _error_body("request not received in time")
+
+            writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(response)}\r\nConnection: close\r\n\r\n".encode('latin-1') + response)
+            await writer.drain()
+
+            # closing with a body still arriving resets the connection, and the client never reads the answer
+            if unread:
+                try:
+                    await asyncio.wait_for(_discard(reader, unread), READ_TIMEOUT)
+                except asyncio.TimeoutError:
+                    pass
+        except ConnectionError:
+            pass  # the client went away
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, dict[str: str], bytes]:
+        """
+        Reads the request line, the headers and a body of Content-Length bytes.
+        :return: the method, the request target, the headers with lowercase names and the body
+        """
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise RequestError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "headers too large")
+        except asyncio.IncompleteReadError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "incomplete request")
+
+        request_line, *header_lines = head.decode('latin-1').split("\r\n")[:-2]
+        try:
+            method, target, _ = request_line.split(" ")
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "malformed request line")
+
+        headers = {}
+        for line in header_lines:
+            name, separator, value = line.partition(":")
+            if not separator:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "malformed header")
+            headers[name.strip().lower()] = value.strip()
+
+        if "transfer-encoding" in headers:
+            raise RequestError(HTTPStatus.LENGTH_REQUIRED, "send the body with a Content-Length")
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "malformed Content-Length")
+        if length > self.max_upload_bytes:
+            raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "upload too large", unread=length)
+
+        try:
+            body = await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "incomplete body")
+
+        return method, target, headers, body
+
+    async def _dispatch(self, method: str, target: str, headers: dict[str: str],
+                        body: bytes) -> tuple[HTTPStatus, str, bytes]:
+        url = urlsplit(target)
+
+        if url.path == "/status":
+            if method != "GET":
+                raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "use GET")
+            running = min(self.jobs, self.workers)
+            return HTTPStatus.OK, "application/json", json.dumps(
+                {"workers": self.workers, "running": running, "queued": self.jobs - running}).encode()
+
+        if url.path != "/calculate":
+            raise RequestError(HTTPStatus.NOT_FOUND, "not found")
+        if method != "POST":
+            raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "use POST")
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        competition_type = query.get("competition_type")
+        if competition_type not in ('obedience', 'rally'):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "competition_type must be 'obedience' or 'rally'")
+        break_tie = query.get("break_tie", "0").lower() in ("1", "true", "yes")
+        output_format = query.get("format", "json")
+        if output_format not in ('json', 'xlsx'):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "format must be 'json' or 'xlsx'")
+
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type != "application/json" and content_type not in UPLOAD_EXTENSIONS:
+            raise RequestError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                               f"content type must be application/json or one of {', '.join(UPLOAD_EXTENSIONS)}")
+
+        if self.jobs >= self.workers + self.max_queue:
+            raise RequestError(HTTPStatus.SERVICE_UNAVAILABLE, "too many jobs queued, try again shortly")
+
+        self.jobs += 1
+        try:
+            response = await asyncio.get_running_loop().run_in_executor(
+                self.executor, run_job, body, content_type, competition_type, break_tie, output_format,
+                self.class_hierarchy)
+        except (KeyError, ValueError, zipfile.BadZipFile) as e:  # an upload that can't be calculated
+            raise RequestError(HTTPStatus.UNPROCESSABLE_ENTITY, str(e.args[-1]) if e.args else type(e).__name__)
+        except Exception as e:
+            raise RequestError(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(e).__name__}: {e}")
+        finally:
+            self.jobs -= 1
+
+        return HTTPStatus.OK, XLSX_CONTENT_TYPE if output_format == 'xlsx' else "application/json", response
+
+
+async def _discard(reader: asyncio.StreamReader, length: int) -> None:
+    """
+    Reads and drops up to length bytes, or until the client stops sending.
+    """
+    while length > 0:
+        chunk = await reader.read(min(length, 64 * 1024))
+        if not chunk:
+            break
+        length -= len(chunk)
+
+
+def _error_body(error) -> bytes:
+    return json.dumps({"error": str(error)}).encode()
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="calculator.py serve",
+                                     description="Serve dog show calculations to the ring tables on this machine.")
+    parser.add_argument('-p', '--port', type=int, default=8765, help="the port to listen on, on localhost")
+    parser.add_argument('-w', '--workers', type=int, help="the number of worker processes")
+    parser.add_argument('-q', '--max_queue', type=int, default=32, help="the number of jobs that can wait for a worker")
+    parser.add_argument('--max_upload', type=float, default=64, help="the largest upload accepted, in megabytes")
+    args = parser.parse_args(argv)
+
+    service = ScoringService(args.port, args.workers, args.max_queue, args.max_upload)
+
+    async def serve() -> None:
+        await service.start()
+        print(f"Serving on http://{HOST}:{service.port} with {service.workers} workers, press Ctrl+C to stop")
+        try:
+            await service.server.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+import argparse
+from dataclasses import dataclass
+from typing import Optional
+
+from openpyxl import Workbook
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+from batch import run_jobs, print_results
+from calculator import load_settings, calculate_results, write_results
+from ingest import read_worksheets, read_rows
+from writer import OpenpyxlWriter
+
+# the longest worksheet name Excel opens
+MAX_SHEET_NAME = 31
+SUMMARY_SHEET = "Summary"
+SUMMARY_COLUMNS = ("Trial", "Winners Sheet", "Entries", "Qualified", "Classes", "Awards", "Status")
+
+
+@dataclass
+class SheetResult:
+    sheet_name: str
+    winners_sheet: str = ''  # the worksheet of the output file the winners are written to, if calculated
+    status: bool = False
+    rows: int = 0
+    contestants: int = 0
+    classes: int = 0
+    awards: int = 0
+    seconds: float = 0.0
+    error: str = ''
+
+
+def _calculate_sheet(sheet_name: str, header: tuple, rows: list[tuple], competition_type: str, break_tie: bool,
+                     class_hierarchy: list[str]) -> tuple[SheetResult, Optional[dict], Optional[dict]]:
+    """
+    Finds the columns of a worksheet, then cleans, ranks and finds the winners of its trial, capturing any error
+    instead of raising it so one bad worksheet does not stop the rest.
+    :return: the result, the column names and the results of the trial, the latter two None if it failed
+    """
+    start = time.perf_counter()
+    try:
+        data, column_names = read_rows(header, rows, competition_type)
+        results = calculate_results(data, column_names, competition_type, break_tie, class_hierarchy)
+    except Exception as e:
+        return SheetResult(sheet_name, seconds=time.perf_counter() - start,
+                           error=f"{type(e).__name__}: {e.args[-1] if e.args else e}"), None, None
+
+    return SheetResult(sheet_name, status=True, rows=data.shape[0], contestants=results["contestants"].shape[0],
+                       classes=len(results["classes"]), awards=len(results["awards"]),
+                       seconds=time.perf_counter() - start), column_names, results
+
+
+def winners_sheet_name(sheet_name: str, used: set[str]) -> str:
+    """
+    Names the Winners worksheet of a trial after its worksheet, shortened to fit Excel's limit and made unique.
+    :param sheet_name: the worksheet of the trial
+    :param used: the worksheet names already taken, the new name is added
+    :return: the name of the Winners worksheet
+    """
+    suffix = " Winners"
+    name = sheet_name[:MAX_SHEET_NAME - len(suffix)] + suffix
+    number = 2
+    while name.lower() in used:
+        numbered = f" Winners {number}"
+        name = sheet_name[:MAX_SHEET_NAME - len(numbered)] + numbered
+        number += 1
+
+    used.add(name.lower())
+    return name
+
+
+def calculate_sheets(input_file: str, output_file: str, competition_type: str, break_tie: bool = False,
+                     sheet_names: list[str] = None, workers: int = None) -> list[SheetResult]:
+    """
+    Calculates the winners of every worksheet of a workbook as a separate trial, such as one worksheet per ring or
+    day. The workbook is read once, then the trials are calculated in parallel over a pool of processes. The winners
+    of each trial are written to their own worksheet of a new output file, after a Summary worksheet of every trial.
+    :param input_file: the input .xlsx file
+    :param output_file: the new output .xlsx file, must differ from the input file
+    :param competition_type: the type of competition, 'obedience' or 'rally'
+    :param break_tie: break ties by class if possible
+    :param sheet_names: the worksheets to calculate, or None for every worksheet except a Winners worksheet written by
+    an earlier run
+    :param workers: the number of worker processes, defaults to the number of cores
+    :return: a result for each worksheet, in the order they were calculated
+    """
+    if not input_file.lower().endswith('.xlsx'):
+        raise TypeError("only .xlsx files have worksheets")
+    if not os.path.exists(input_file):
+        raise FileNotFoundError("file not found")
+    if os.path.abspath(input_file) == os.path.abspath(output_file):
+        raise ValueError("the winners of several worksheets can only be written to a new file")
+    if competition_type not in ('obedience', 'rally'):
+        raise ValueError("competition_type must be 'obedience' or 'rally'")
+
+    settings = load_settings()
+
+    worksheets = read_worksheets(input_file, sheet_names)
+    if sheet_names is None:
+        worksheets.pop("Winners", None)
+    if not worksheets:
+        raise KeyError("no worksheets to calculate")
+
+    jobs = [(sheet_name, header, rows, competition_type, break_tie, settings["class hierarchy"])
+            for sheet_name, (header, rows) in worksheets.items()]
+    del worksheets
+
+    calculated = run_jobs(_calculate_sheet, jobs, lambda job, error: (SheetResult(job[0], error=error), None, None),
+                          workers)
+
+    output_workbook = Workbook()
+    summary = output_workbook.active
+    summary.title = SUMMARY_SHEET
+    used = {SUMMARY_SHEET.lower()}
+
+    for sheet_result, column_names, results in calculated:
+        if results is None:
+            continue
+
+        sheet_result.winners_sheet = winners_sheet_name(sheet_result.sheet_name, used)
+        writer = OpenpyxlWriter(output_workbook, output_workbook.create_sheet(sheet_result.winners_sheet),
+                                output_file, column_names)
+        write_results(writer, results)
+        writer.size_columns()
+
+    sheet_results = [sheet_result for sheet_result, _, _ in calculated]
+    _write_summary(summary, sheet_results)
+    output_workbook.save(output_file)
+
+    return sheet_results
+
+
+def _write_summary(worksheet, sheet_results: list[SheetResult]) -> None:
+    """
+    Writes a row for each trial, with its size and status, to the Summary worksheet.
+    """
+    rows = [list(SUMMARY_COLUMNS)]
+    for result in sheet_results:
+        rows.append([result.sheet_name, result.winners_sheet or None, result.rows, result.contestants, result.classes,
+                     result.awards, "Complete" if result.status else f"Error: {result.error}"])
+
+    for row in rows:
+        worksheet.append(row)
+    for cell in worksheet[1]:
+        cell.font = Font(bold=True)
+
+    for column, values in enumerate(zip(*rows), 1):
+        worksheet.column_dimensions[get_column_letter(column)].width = max(len(str(value)) for value in values
+                                                                           if value is not None)
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="calculator.py sheets",
+                                     description="Determine the winners of every worksheet of a workbook, such as one "
+                                                 "worksheet per ring or day.")
+    parser.add_argument('input_file', help="the input .xlsx file")
+    parser.add_argument('output_file', help="the new output .xlsx file")
+    parser.add_argument('competition_type', choices=['obedience', 'rally'], help="the type of competition")
+    parser.add_argument('-s', '--sheet', action='append', dest='sheets',
+                        help="a worksheet to calculate, may be repeated, defaults to every worksheet")
+    parser.add_argument('-n', '--no_ties', action='store_true', help="break ties by class if possible")
+    parser.add_argument('-w', '--workers', type=int, help="the number of worker processes")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input_file):
+        parser.error(f"file not found: {args.input_file}")
+
+    results = calculate_sheets(args.input_file, args.output_file, args.competition_type, args.no_ties, args.sheets,
+                               args.workers)
+
+    return print_results([result.sheet_name for result in results], results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+# modules that should not be loaded by the time the window is shown
+HEAVY_MODULES = ("pandas", "openpyxl", "numpy", "calculator")
+
+
+def run_child(start: float, input_file: str, competition_type: str) -> None:
+    """
+    Starts the GUI in this process, records when the window is shown and when the first calculation completes, then
+    prints the timings as JSON. Times are measured from start, the wall clock time the parent launched this process.
+    """
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+
+    import main
+
+    timings = {}
+    app = QApplication(sys.argv)
+    window = main.MainWindow()
+    window.show()
+
+    def window_shown() -> None:
+        timings["time to window"] = time.time() - start
+        timings["heavy modules at window"] = [module for module in HEAVY_MODULES if module in sys.modules]
+        window.preload()
+
+        # start the first calculation, as a user would
+        window.input_file_field.setText(input_file)
+        window.new_file.setChecked(True)
+        window.new_file_changed()
+        window.obedience_button.setChecked(competition_type == "obedience")
+        window.rally_button.setChecked(competition_type == "rally")
+        window.calculate_function()
+        poll.start(5)
+
+    def check_result() -> None:
+        if window.workers:
+            return
+
+        poll.stop()
+        timings["time to first result"] = time.time() - start
+        timings["status"] = window.status_field.text()
+        app.quit()
+
+    poll = QTimer()
+    poll.timeout.connect(check_result)
+    QTimer.singleShot(0, window_shown)
+    app.exec_()
+
+    print(json.dumps(timings))
+
+
+def run_benchmark(input_file: str, competition_type: str, repeat: int = 5) -> dict:
+    """
+    Launches the GUI in a fresh interpreter repeat times, so every run pays the full import cost.
+    :param input_file: the input file of the first calculation
+    :param competition_type: the type of competition
+    :param repeat: the number of cold starts
+    :return: the median time to window and time to first result, and the timings of every run
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.time()
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', str(start), input_file,
+                                 competition_type], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    return {
+        "time to window": statistics.median(run["time to window"] for run in runs),
+        "time to first result": statistics.median(run["time to first result"] for run in runs),
+        "runs": runs,
+    }
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the cold start time of the GUI.")
+    parser.add_argument('input_file', help="the input file of the first calculation")
+    parser.add_argument('competition_type', choices=['obedience', 'rally'], help="the type of competition")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="the number of cold starts")
+    parser.add_argument('--max_window_seconds', type=float, help="fail if the median time to window is slower")
+    parser.add_argument('--max_result_seconds', type=float, help="fail if the median time to first result is slower")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(os.path.abspath(args.input_file), args.competition_type, args.repeat)
+    print(json.dumps(results, indent=2))
+
+    failures = []
+    if any(run["heavy modules at window"] for run in results["runs"]):
+        failures.append("the calculation stack was loaded before the window was shown")
+    if args.max_window_seconds is not None and results["time to window"] > args.max_window_seconds:
+        failures.append(f"time to window {results['time to window']:.2f}s is over {args.max_window_seconds}s")
+    if args.max_result_seconds is not None and results["time to first result"] > args.max_result_seconds:
+        failures.append(f"time to first result {results['time to first result']:.2f}s is over "
+                        f"{args.max_result_seconds}s")
+
+    for failure in failures:
+        print(f"Regression: {failure}", file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run_child(float(sys.argv[2]), sys.argv[3], sys.argv[4])
+    else:
+        sys.exit(main())
@@ -0,0 +1,145 @@
+from typing import Callable
+
+import pandas
+from pandas.core.frame import DataFrame
+
+from calculator import COMBINED_AWARDS, RunReport, start_run, load_settings, augment_data, find_awards, \
+    champions_of_record, create_writer, write_results
+from ingest import read_contestant_chunks
+from ranking import sort_contestants, class_placements, class_category_index, award_eligible, \
+    combined_category_index, combined_columns
+
+
+class CandidateContestants:
+    """
+    Keeps only the contestants of a trial that can still place or win an award, as the trial is read in chunks. The
+    class placements and awards are then found from the candidates exactly as from every contestant:
+
+    - the top placements of each class
+    - every eligible contestant with the best score of the trial, of the champions and of their group, among whom the
+    single score awards and the group highs are decided, ties included
+    - the best entry of each dog in each class of a combined award, by sort key and by class rank then score then
+    pluses, from which the combined scores and their tie breaks are found
+    - the first entry of each group, which keeps the groups in entry order
+
+    The candidates still grow with the number of classes and groups, with the number of dogs entered in the classes of
+    the combined awards, and with the entries tied for a best score, though not with the entries of the other classes.
+    """
+
+    def __init__(self, column_names: dict[str: str], class_hierarchy: list[str],
+                 combined_columns: list[tuple[str, bool]], places: int = 4):
+        self.column_names = column_names
+        self.class_hierarchy = class_hierarchy
+        self.combined_columns = combined_columns
+        self.places = places
+        self.candidates = None
+        self.classes = {}  # every class in entry order, including classes without a qualifying score
+        self.rows = 0
+        self.contestants = 0  # entries with a qualifying score
+
+    def add(self, chunk: DataFrame) -> None:
+        """
+        Cleans a chunk of contestants and keeps the candidates among them and the earlier candidates.
+        :param chunk: a chunk of contestants, indexed by row number, after the rows of earlier chunks
+        """
+        self.rows += chunk.shape[0]
+        self.classes.update(dict.fromkeys(chunk[self.column_names["class"]].dropna().unique()))
+
+        contestants = augment_data(chunk, self.column_names, self.class_hierarchy)
+        self.contestants += contestants.shape[0]
+
+        if self.candidates is not None:
+            contestants = pandas.concat([self.candidates, contestants])
+        self.candidates = self._prune(contestants)
+
+    def _prune(self, contestants: DataFrame) -> DataFrame:
+        class_, score, call_name = (self.column_names[column] for column in ("class", "score", "call name"))
+        ranked = sort_contestants(contestants)
+
+        keep = [ranked.groupby(class_, sort=False, dropna=False).head(self.places).index]
+
+        # the single score awards and the group highs only look at the eligible entries with the best score
+        categories = class_category_index(ranked[class_])
+        eligible = award_eligible(categories)
+        conditions = [categories["all"]]
+        if "champion" in self.column_names:
+            conditions.append(champions_of_record(ranked, self.column_names))
+        for condition in conditions:
+            scores = ranked[score].where(condition & eligible)
+            keep.append(ranked.index[scores == scores.max()])
+        if "group" in self.column_names:
+            scores = ranked[score].where(eligible)
+            best_scores = scores.groupby(ranked[self.column_names["group"]], sort=False, dropna=False).transform('max')
+            keep.append(ranked.index[scores == best_scores])
+
+        # only the entries combined_winners looks at, which can be many, as most dogs enter few classes
+        combined = ranked.loc[combined_category_index(categories, self.combined_columns).any(axis=1).to_numpy()]
+        keep.append(combined.groupby([call_name, class_], sort=False, dropna=False).head(1).index)
+        keep.append(combined.sort_values(['Class Rank', score, 'Pluses'], ascending=False, kind='stable').groupby(
+            [call_name, class_], sort=False, dropna=False).head(1).index)
+
+        if "group" in self.column_names:
+            keep.append(contestants.groupby(self.column_names["group"], sort=False, dropna=False).head(1).index)
+
+        # the candidates stay in entry order
+        return contestants.loc[contestants.index.isin(keep[0].append(keep[1:]))]
+
+
+def calculate_streaming(input_file: str, output_file: str, competition_type: str, break_tie: bool = False,
+                        engine: str = 'openpyxl', progress: Callable[[str], None] = None, trace_memory: bool = False,
+                        chunk_rows: int = 10000) -> RunReport:
+    """
+    Determines the winners of a dog show like calculate, reading the input file in chunks and keeping only the
+    candidates for each placement and award, see CandidateContestants for how they grow. The read stage also cleans
+    each chunk, so there is no separate clean stage.
+    :param input_file: the input .xlsx, .csv or .parquet file
+    :param output_file: the output file, if identical to input_file the winners are written to its Winners worksheet
+    :param competition_type: the type of competition, 'obedience' or 'rally'
+    :param break_tie: break ties by class if possible
+    :param engine: the library used to write a new output file, 'openpyxl' or 'xlsxwriter'
+    :param progress: called with each stage as it starts, may raise CalculationCancelled to stop the run
+    :param trace_memory: measure the peak memory of each stage with tracemalloc, which slows the calculation down
+    :param chunk_rows: the number of rows read at a time
+    :return: a report of the time taken by each stage and the size of the trial, once the output file is saved
+    """
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be at least 1")
+
+    run_report, report = start_run(input_file, output_file, competition_type, engine, progress, trace_memory)
+
+    settings = load_settings()
+
+    try:
+        report("read")
+        column_names, chunks = read_contestant_chunks(input_file, competition_type, chunk_rows)
+        candidates = CandidateContestants(column_names, settings["class hierarchy"],
+                                          combined_columns(COMBINED_AWARDS.get(competition_type, {})))
+        for chunk in chunks:
+            candidates.add(chunk)
+
+        contestants = candidates.candidates
+        if contestants is None:  # no entries, cleaned as an empty chunk so the columns are still there
+            candidates.add(DataFrame(columns=list(column_names.values())))
+            contestants = candidates.candidates
+
+        report("rank")
+        ranked = sort_contestants(contestants)
+        placements = class_placements(ranked, column_names)
+
+        report("awards")
+        awards = find_awards(contestants, ranked, column_names, competition_type, break_tie)
+
+        results = {"classes": list(candidates.classes), "placements": placements, "awards": awards}
+        run_report.rows, run_report.classes = candidates.rows, len(results["classes"])
+        run_report.contestants, run_report.awards = candidates.contestants, len(awards)
+
+        report("write")
+        writer = create_writer(input_file, output_file, engine, column_names)
+        write_results(writer, results)
+
+        report("save")
+        writer.save()
+    finally:
+        run_report.finish()
+
+    return run_report
@@ -0,0 +1,125 @@
+import os
+import random
+import argparse
+from dataclasses import dataclass, asdict
+
+from pandas.core.frame import DataFrame
+
+# ordered so the classes of the combined awards come first
+OBEDIENCE_CLASSES = ["Novice A", "Novice B", "Open A", "Open B", "Utility A", "Utility B", "Preferred Open",
+                     "Preferred Utility", "Beginner Novice A", "Beginner Novice B", "Preferred Novice",
+                     "Graduate Novice", "Graduate Open", "Versatility"]
+RALLY_CLASSES = ["Rally Novice A", "Rally Novice B", "Rally Intermediate", "Rally Advanced A", "Rally Advanced B",
+                 "Rally Excellent A", "Rally Excellent B", "Rally Master", "Rally Choice"]
+GROUPS = ["Sporting", "Hound", "Working", "Terrier", "Toy", "Non-Sporting", "Herding"]
+
+# (lowest qualifying score, perfect score)
+SCORE_RANGES = {"obedience": (170, 200), "rally": (70, 100)}
+
+
+@dataclass
+class TrialSpec:
+    competition_type: str = "obedience"
+    entries: int = 200
+    classes: int = 10
+    groups: int = 7
+    non_qualifying: float = 0.1  # share of entries scored AB or NQ
+    pluses: float = 0.1  # share of qualifying scores with '+' tie breakers
+    champions: float = 0.2  # share of dogs that are champions of record
+    classes_per_dog: float = 1.6  # average number of classes each dog is entered in
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        return "-".join(str(value) for value in asdict(self).values())
+
+
+def class_names(competition_type: str, count: int) -> list[str]:
+    """
+    The names of the classes of a trial, real class names first, then numbered copies of them.
+    """
+    base_classes = OBEDIENCE_CLASSES if competition_type == "obedience" else RALLY_CLASSES
+    return [base_classes[i % len(base_classes)] + (f" {i // len(base_classes) + 1}" if i >= len(base_classes) else "")
+            for i in range(count)]
+
+
+def group_names(count: int) -> list[str]:
+    return [GROUPS[i] if i < len(GROUPS) else f"Group {i + 1}" for i in range(count)]
+
+
+def generate_trial(spec: TrialSpec) -> DataFrame:
+    """
+    Generates the entries of a trial. Dogs are entered in one or more classes, so combined awards have contenders,
+    and scores pile up near perfect, so there are ties to break.
+    :param spec: the size and makeup of the trial
+    :return: a dataframe of entries, with the columns of a show secretary's export
+    """
+    rng = random.Random(spec.seed)
+    classes = class_names(spec.competition_type, spec.classes)
+    groups = group_names(spec.groups)
+    low_score, perfect_score = SCORE_RANGES[spec.competition_type]
+
+    rows = []
+    dog = 0
+    while len(rows) < spec.entries:
+        dog += 1
+        call_name = f"Dog {dog}"
+        handler = f"Handler {rng.randint(1, max(1, spec.entries // 3))}"
+        group = rng.choice(groups)
+        champion = "Ch" if rng.random() < spec.champions else ""
+
+        entered_classes = min(len(classes), max(1, round(rng.expovariate(1 / spec.classes_per_dog))))
+        for class_ in rng.sample(classes, entered_classes):
+            if rng.random() < spec.non_qualifying:
+                score = rng.choice(["AB", "NQ"])
+            else:
+                score = perfect_score - min(perfect_score - low_score, int(rng.expovariate(1 / 4)))
+                if rng.random() < spec.pluses:
+                    score = str(score) + "+" * rng.randint(1, 3)
+
+            row = {"Armband Number": len(rows) + 100, "Handler": handler, "Call Name": call_name, "Class": class_,
+                   "Score": score}
+            if spec.competition_type == "obedience":
+                row["Group"] = group
+                row["Champion"] = champion
+
+            rows.append(row)
+            if len(rows) == spec.entries:
+                break
+
+    return DataFrame(rows)
+
+
+def write_trial(spec: TrialSpec, output_file: str) -> str:
+    """
+    Generates a trial and writes it to an .xlsx or .csv file.
+    :param spec: the size and makeup of the trial
+    :param output_file: the output file
+    :return: the output file
+    """
+    entries = generate_trial(spec)
+
+    if os.path.splitext(output_file)[1].lower() == '.csv':
+        entries.to_csv(output_file, index=False)
+    else:
+        entries.to_excel(output_file, index=False)
+
+    return output_file
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic trial workbook.")
+    parser.add_argument('output_file', help="the output .xlsx or .csv file")
+    parser.add_argument('competition_type', choices=['obedience', 'rally'], help="the type of competition")
+    parser.add_argument('--entries', type=int, default=200, help="the number of entries")
+    parser.add_argument('--classes', type=int, default=10, help="the number of classes")
+    parser.add_argument('--groups', type=int, default=7, help="the number of groups")
+    parser.add_argument('--non_qualifying', type=float, default=0.1, help="the share of AB and NQ scores")
+    parser.add_argument('--pluses', type=float, default=0.1, help="the share of scores with '+' tie breakers")
+    parser.add_argument('--champions', type=float, default=0.2, help="the share of champion dogs")
+    parser.add_argument('--classes_per_dog', type=float, default=1.6, help="the average number of classes per dog")
+    parser.add_argument('--seed', type=int, default=0, help="the random seed")
+    args = parser.parse_args()
+
+    write_trial(TrialSpec(args.competition_type, args.entries, args.classes, args.groups, args.non_qualifying,
+                          args.pluses, args.champions, args.classes_per_dog, args.seed), args.output_file)
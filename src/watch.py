@@ -0,0 +1,193 @@
+import os
+import sys
+import time
+import argparse
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import numpy
+import pandas
+
+from calculator import load_settings, augment_data, find_awards, create_writer, write_results
+from ingest import SUPPORTED_EXTENSIONS, read_contestants
+from ranking import sort_contestants, class_placements
+
+
+@dataclass
+class WatchUpdate:
+    changed_classes: list = field(default_factory=list)  # classes whose entries changed since the last update
+    rows: int = 0
+    seconds: float = 0.0
+
+
+class TrialWatcher:
+    """
+    Recalculates the results of a trial each time its input file is saved. The entries of each class are compared to
+    the previous snapshot, and only the classes whose entries changed are cleaned and placed again. The awards are
+    found again from the cleaned entries of every class, as they can depend on any class.
+    """
+
+    def __init__(self, input_file: str, output_file: str, competition_type: str, break_tie: bool = False,
+                 engine: str = 'openpyxl'):
+        if os.path.splitext(input_file)[1].lower() not in SUPPORTED_EXTENSIONS:
+            raise TypeError("only .xlsx, .csv and .parquet are supported")
+        if os.path.abspath(input_file) == os.path.abspath(output_file):
+            raise ValueError("watch mode can only write to a new file, the input file is open for scoring")
+        if competition_type not in ('obedience', 'rally'):
+            raise ValueError("competition_type must be 'obedience' or 'rally'")
+
+        self.input_file = input_file
+        self.output_file = output_file
+        self.competition_type = competition_type
+        self.break_tie = break_tie
+        self.engine = engine
+        self.class_hierarchy = load_settings()["class hierarchy"]
+
+        self.signature = None  # the modification time and size of the input file at the last update
+        self._last_seen = None
+        self.column_names = None
+
+        # the snapshot of each class at the last update, classes are keyed by name, with None for entries without one
+        self.class_hashes = {}
+        self.class_contestants = {}
+        self.class_placements = {}
+
+    def poll(self) -> bool:
+        """
+        Checks whether the input file was saved since the last update, and has not changed since the previous poll,
+        so a file that is still being written is left alone.
+        :return: True if the results should be updated
+        """
+        signature = self._signature()
+        settled = signature == self._last_seen
+        self._last_seen = signature
+
+        return settled and signature is not None and signature != self.signature
+
+    def update(self) -> WatchUpdate:
+        """
+        Reads the input file, recalculates the results of the classes that changed, and writes the output file.
+        :return: the classes that changed, the number of entries and the time taken
+        """
+        start = time.perf_counter()
+        self.signature = self._signature()  # a failed update is retried on the next save, not on every poll
+
+        data, column_names = read_contestants(self.input_file, self.competition_type)
+        data.index = pandas.RangeIndex(data.shape[0])  # entries are identified by their row
+
+        if column_names != self.column_names:  # the columns moved, start over
+            self.class_hashes, self.class_contestants, self.class_placements = {}, {}, {}
+            self.column_names = column_names
+
+        # hash each entry with its row, then compare the entries of each class with the last snapshot
+        hashes = pandas.util.hash_pandas_object(data, index=True).to_numpy()
+        class_rows = {(None if isinstance(class_, float) and numpy.isnan(class_) else class_): rows
+                      for class_, rows in data.groupby(column_names["class"], sort=False, dropna=False).indices.items()}
+        class_hashes = {class_: hashes[rows] for class_, rows in class_rows.items()}
+        changed = [class_ for class_, class_hash in class_hashes.items()
+                   if class_ not in self.class_hashes or not numpy.array_equal(class_hash, self.class_hashes[class_])]
+
+        # clean and place only the changed classes
+        for class_ in changed:
+            self.class_contestants[class_] = augment_data(data.iloc[class_rows[class_]], column_names,
+                                                          self.class_hierarchy)
+        for class_ in set(self.class_contestants) - set(class_hashes):  # classes with no entries left
+            del self.class_contestants[class_]
+            self.class_placements.pop(class_, None)
+
+        contestants = pandas.concat(list(self.class_contestants.values())).sort_index() if self.class_contestants \
+            else augment_data(data, column_names, self.class_hierarchy)
+        ranked = sort_contestants(contestants)
+
+        changed_named = [class_ for class_ in changed if class_ is not None]
+        if changed_named:
+            self.class_placements.update(class_placements(
+                ranked.loc[ranked[column_names["class"]].isin(changed_named)], column_names))
+            for class_ in changed_named:
+                if not self.class_contestants[class_].shape[0]:  # no qualifying scores yet
+                    self.class_placements.pop(class_, None)
+
+        results = {
+            "classes": data[column_names["class"]].dropna().unique(),
+            "placements": self.class_placements,
+            "awards": find_awards(contestants, ranked, column_names, self.competition_type, self.break_tie),
+        }
+
+        writer = create_writer(self.input_file, self.output_file, self.engine, column_names)
+        write_results(writer, results)
+        writer.save()
+
+        self.class_hashes = class_hashes
+
+        return WatchUpdate(changed_named, data.shape[0], time.perf_counter() - start)
+
+    def watch(self, interval: float = 0.25, on_update: Callable[[WatchUpdate], None] = None,
+              on_error: Callable[[Exception], None] = None, should_stop: Callable[[], bool] = None) -> None:
+        """
+        Updates the results once, then each time the input file is saved, until should_stop returns True.
+        :param interval: the seconds between checks of the input file
+        :param on_update: called with each update
+        :param on_error: called with the error of a failed update, such as a file saved without a needed column, the
+        update is retried when the file is saved again
+        :param should_stop: called between checks, stops watching when it returns True
+        """
+        first = True
+        while should_stop is None or not should_stop():
+            if first or self.poll():
+                first = False
+                try:
+                    update = self.update()
+                except Exception as e:
+                    if on_error is None:
+                        raise
+                    on_error(e)
+                else:
+                    if on_update is not None:
+                        on_update(update)
+
+            time.sleep(interval)
+
+    def _signature(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = os.stat(self.input_file)
+        except FileNotFoundError:  # between the steps of a save
+            return None
+
+        return stat.st_mtime_ns, stat.st_size
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="calculator.py watch",
+                                     description="Update the winners of a dog show each time its file is saved.")
+    parser.add_argument('input_file', help="the input .xlsx, .csv or .parquet file")
+    parser.add_argument('output_file', help="the output file, must differ from the input file")
+    parser.add_argument('competition_type', choices=['obedience', 'rally'], help="the type of competition")
+    parser.add_argument('-n', '--no_ties', action='store_true', help="break ties by class if possible")
+    parser.add_argument('-e', '--engine', choices=['openpyxl', 'xlsxwriter'], default='openpyxl',
+                        help="the library used to write the output file")
+    parser.add_argument('-i', '--interval', type=float, default=0.25, help="the seconds between checks of the file")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input_file):
+        parser.error(f"file not found: {args.input_file}")
+
+    watcher = TrialWatcher(args.input_file, args.output_file, args.competition_type, args.no_ties, args.engine)
+
+    def on_update(update: WatchUpdate) -> None:
+        classes = ", ".join(str(class_) for class_ in update.changed_classes) or "no classes"
+        print(f"{time.strftime('%H:%M:%S')}\tUpdated {classes} in {update.seconds:.2f}s")
+
+    def on_error(e: Exception) -> None:
+        print(f"{time.strftime('%H:%M:%S')}\tError: {e.args[-1] if e.args else type(e).__name__}", file=sys.stderr)
+
+    print(f"Watching {args.input_file}, press Ctrl+C to stop")
+    try:
+        watcher.watch(args.interval, on_update, on_error)
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+import math
+from xml.sax.saxutils import escape
+
+from pandas.core.frame import DataFrame
+
+from openpyxl import Workbook
+from openpyxl.styles import Font, Alignment, PatternFill, NamedStyle
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.worksheet import Worksheet
+
+import xlsx_package
+
+# empty cells are counted as wide as 'None', as openpyxl's str(cell.value) of an empty cell is
+MIN_COLUMN_WIDTH = len(str(None))
+
+# (fill color, text color) of first through fourth place
+PLACEMENT_COLORS = (('000000FF', '00FFFFFF'), ('00FF0000', '00FFFFFF'), ('00FFFF00', '00000000'),
+                    ('00FFFFFF', '00000000'))
+
+
+class WinnersWriter:
+    """
+    Writes the Winners worksheet row by row. Rows and their styles are built here, backends only write them. Column
+    widths are tracked as rows are written, so the finished worksheet never has to be read back.
+    """
+
+    def __init__(self, column_names: dict[str: str]):
+        self.column_names = column_names
+        self.column_widths = []
+
+    def write_placements(self, class_name: str, winners: DataFrame) -> None:
+        """
+        Writes the placements of a class, colored by place.
+        :param class_name: the name of the class
+        :param winners: a dataframe of the class winners, in placement order, or None if the class has no winners
+        """
+        # write competition name and subheaders
+        self._append(['', class_name], [None, 'heading'], merge=(2, 5))
+        self._append(['', self.column_names["number"], self.column_names["handler"], self.column_names["call name"],
+                      self.column_names["score"]], [None] + ['bold'] * 4)
+
+        # write winners
+        if winners is None or winners.shape[0] < 1:
+            self._append([''] + ['-'] * 4)
+        else:
+            for place, row in enumerate(self._winner_rows(winners), 1):
+                self._append([place] + row, [None] + [f'place {place}'] * 4)
+
+        self._append([''])
+
+    def write_award_header(self) -> None:
+        self._append(['', self.column_names["number"], self.column_names["handler"], self.column_names["call name"]],
+                     [None] + ['bold'] * 3)
+
+    def write_award(self, award_name: str, winners: DataFrame) -> None:
+        """
+        Writes the winners of an award, the award name on the first row only.
+        :param award_name: the name of the award
+        :param winners: a dataframe of the award winners
+        """
+        if winners.shape[0] < 1:
+            self._append([award_name] + ['-'] * 4, ['bold'])
+        else:
+            for w, row in enumerate(self._winner_rows(winners)):
+                if w == 0:
+                    self._append([award_name] + row, ['bold'])
+                else:
+                    self._append([''] + row)
+
+    def save(self) -> None:
+        """
+        Sizes each column to the width of its largest cell value, then saves the output file.
+        """
+        self.size_columns()
+        self._save()
+
+    def size_columns(self) -> None:
+        """
+        Sizes each column to the width of its largest cell value, without saving, for workbooks of several worksheets
+        that are saved once.
+        """
+        for column, width in enumerate(self.column_widths, 1):
+            self._set_column_width(column, width)
+
+    def _winner_rows(self, winners: DataFrame) -> list[list]:
+        """
+        Converts winners to rows of number, handler, call name and display score, with scores that had + values
+        converted back to their display scores.
+        """
+        numbers, handlers, call_names = (winners[self.column_names[column]].tolist()
+                                         for column in ("number", "handler", "call name"))
+        scores = [f"{int(score)}{'+' * int(pluses)}"
+                  for score, pluses in zip(winners[self.column_names["score"]].tolist(), winners['Pluses'].tolist())]
+
+        return [[_cell_value(value) for value in row] for row in zip(numbers, handlers, call_names, scores)]
+
+    def _append(self, values: list, styles: list = (), merge: tuple[int, int] = None) -> None:
+        """
+        Appends a row to the worksheet and updates the column widths.
+        :param values: the cell values
+        :param styles: the style key of each cell, or None for no style
+        :param merge: the first and last column of cells to merge, numbered from 1, the value of the first one is kept
+        """
+        if len(values) > len(self.column_widths):
+            self.column_widths += [MIN_COLUMN_WIDTH] * (len(values) - len(self.column_widths))
+
+        for column, value in enumerate(values):
+            if value is not None:
+                self.column_widths[column] = max(self.column_widths[column], len(str(value)))
+
+        self._write_row(values, styles, merge)
+
+    def _write_row(self, values: list, styles: list, merge: tuple[int, int]) -> None:
+        raise NotImplementedError
+
+    def _set_column_width(self, column: int, width: int) -> None:
+        """
+        Sets the width of a column, columns are numbered from 1.
+        """
+        raise NotImplementedError
+
+    def _save(self) -> None:
+        raise NotImplementedError
+
+
+class OpenpyxlWriter(WinnersWriter):
+    """
+    Writes to an openpyxl worksheet, used for new files. Each style is registered once as a named style of the
+    workbook.
+    """
+
+    def __init__(self, workbook: Workbook, worksheet: Worksheet, output_file: str, column_names: dict[str: str]):
+        super().__init__(column_names)
+        self.workbook = workbook
+        self.worksheet = worksheet
+        self.output_file = output_file
+        self.row = 0  # the worksheet is expected to be empty
+
+        named_styles = {
+            'bold': NamedStyle("Winners Bold", font=Font(bold=True)),
+            'heading': NamedStyle("Winners Heading", font=Font(bold=True), alignment=Alignment(horizontal='center')),
+        }
+        for place, (fill_color, text_color) in enumerate(PLACEMENT_COLORS, 1):
+            named_styles[f'place {place}'] = NamedStyle(
+                f"Winners Place {place}", font=Font(color=text_color),
+                fill=PatternFill(start_color=fill_color, end_color=fill_color, fill_type='solid'))
+
+        # styles are kept when writing to a workbook that already has a Winners sheet
+        for named_style in named_styles.values():
+            if named_style.name not in workbook.named_styles:
+                workbook.add_named_style(named_style)
+
+        self.styles = {key: named_style.name for key, named_style in named_styles.items()}
+
+    def _save(self) -> None:
+        self.workbook.save(self.output_file)
+
+    def _set_column_width(self, column: int, width: int) -> None:
+        self.worksheet.column_dimensions[get_column_letter(column)].width = width
+
+    def _write_row(self, values: list, styles: list, merge: tuple[int, int]) -> None:
+        self.worksheet.append(values)
+        self.row += 1
+
+        for column, style in enumerate(styles, 1):
+            if style is not None:
+                self.worksheet.cell(row=self.row, column=column).style = self.styles[style]
+
+        if merge is not None:
+            self.worksheet.merge_cells(start_row=self.row, start_column=merge[0], end_row=self.row,
+                                       end_column=merge[1])
+
+
+class PackageWriter(WinnersWriter):
+    """
+    Writes the worksheet straight into the package of an existing .xlsx file, replacing an earlier worksheet of the
+    same name, without loading the rest of the workbook. Rows are kept as xml until saved, as the style ids are only
+    known once the styles are added to the workbook.
+    """
+
+    def __init__(self, output_file: str, column_names: dict[str: str], sheet_name: str = "Winners"):
+        super().__init__(column_names)
+        self.output_file = output_file
+        self.sheet_name = sheet_name
+        self.rows = []  # (cells of (reference, style key, xml after the style), merged range) of each row
+
+        self.styles = {
+            'bold': {"name": "Winners Bold", "bold": True},
+            'heading': {"name": "Winners Heading", "bold": True, "center": True},
+        }
+        for place, (fill_color, text_color) in enumerate(PLACEMENT_COLORS, 1):
+            self.styles[f'place {place}'] = {"name": f"Winners Place {place}", "color": text_color, "fill": fill_color}
+
+    def _save(self) -> None:
+        xlsx_package.write_worksheet(self.output_file, self.sheet_name, self.styles, self._render)
+
+    def _set_column_width(self, column: int, width: int) -> None:
+        pass  # the tracked column widths are written by _render
+
+    def _write_row(self, values: list, styles: list, merge: tuple[int, int]) -> None:
+        row = len(self.rows) + 1
+        cells = []
+        for column, value in enumerate(values, 1):
+            style = styles[column - 1] if column <= len(styles) else None
+            reference = f'{get_column_letter(column)}{row}'
+
+            if value is None or value == '':
+                if style is not None:
+                    cells.append((reference, style, ''))
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                cells.append((reference, style, f'><v>{value}</v></c>'))
+            else:
+                text = escape(str(value))
+                cells.append((reference, style, f' t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'))
+
+        merged = None if merge is None else f'{get_column_letter(merge[0])}{row}:{get_column_letter(merge[1])}{row}'
+        self.rows.append((cells, merged))
+
+    def _render(self, style_ids: dict[str: int]) -> str:
+        """
+        Renders the worksheet xml, with the style ids of the workbook the worksheet is written to.
+        """
+        columns = "".join(f'<col min="{column}" max="{column}" width="{width}" customWidth="1"/>'
+                          for column, width in enumerate(self.column_widths, 1))
+        rows = "".join(f'<row r="{row}">' + "".join(
+            f'<c r="{reference}"' + ('' if style is None else f' s="{style_ids[style]}"') + (body or '/>')
+            for reference, style, body in cells) + '</row>' for row, (cells, _) in enumerate(self.rows, 1))
+        merged = [merged for _, merged in self.rows if merged is not None]
+        merge_cells = f'<mergeCells count="{len(merged)}">' + \
+                      "".join(f'<mergeCell ref="{reference}"/>' for reference in merged) + '</mergeCells>'
+
+        return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f'<worksheet xmlns="{xlsx_package.MAIN_NAMESPACE}" xmlns:r="{xlsx_package.RELATIONSHIPS_NAMESPACE}">'
+                f'{"<cols>" + columns + "</cols>" if columns else ""}<sheetData>{rows}</sheetData>'
+                f'{merge_cells if merged else ""}</worksheet>')
+
+
+class XlsxWriterWriter(WinnersWriter):
+    """
+    Writes a new file with xlsxwriter in constant memory mode, where each row is flushed to disk once written.
+    """
+
+    def __init__(self, output_file: str, column_names: dict[str: str]):
+        import xlsxwriter  # optional dependency, only needed for the xlsxwriter engine
+
+        super().__init__(column_names)
+        self.workbook = xlsxwriter.Workbook(output_file, {'constant_memory': True})
+        self.worksheet = self.workbook.add_worksheet("Sheet")
+        self.row = -1  # xlsxwriter numbers rows from 0
+
+        self.styles = {
+            'bold': self.workbook.add_format({'bold': True}),
+            'heading': self.workbook.add_format({'bold': True, 'align': 'center'}),
+        }
+        for place, (fill_color, text_color) in enumerate(PLACEMENT_COLORS, 1):
+            self.styles[f'place {place}'] = self.workbook.add_format(
+                {'font_color': f"#{text_color[2:]}", 'bg_color': f"#{fill_color[2:]}", 'pattern': 1})
+
+    def _save(self) -> None:
+        self.workbook.close()
+
+    def _set_column_width(self, column: int, width: int) -> None:
+        self.worksheet.set_column(column - 1, column - 1, width)
+
+    def _write_row(self, values: list, styles: list, merge: tuple[int, int]) -> None:
+        self.row += 1
+        styles = list(styles) + [None] * (len(values) - len(styles))
+
+        for column, (value, style) in enumerate(zip(values, styles)):
+            if merge is not None and merge[0] - 1 <= column <= merge[1] - 1:
+                continue  # written with the merged range below
+
+            if value == '':
+                value = None  # xlsxwriter writes empty strings as blank cells
+
+            if style is None:
+                self.worksheet.write(self.row, column, value)
+            else:
+                self.worksheet.write(self.row, column, value, self.styles[style])
+
+        if merge is not None:
+            first_column, last_column = merge[0] - 1, merge[1] - 1
+            value = values[first_column] if first_column < len(values) else None
+            style = styles[first_column] if first_column < len(styles) else None
+            self.worksheet.merge_range(self.row, first_column, self.row, last_column, value,
+                                       self.styles[style] if style is not None else None)
+
+
+def _cell_value(value):
+    """
+    Converts missing values to empty cells.
+    """
+    if isinstance(value, float) and math.isnan(value):
+        return None
+
+    return value
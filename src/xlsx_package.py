@@ -0,0 +1,323 @@
+import os
+import re
+import posixpath
+import tempfile
+import zipfile
+from typing import Callable
+from xml.sax.saxutils import escape, quoteattr
+
+MAIN_NAMESPACE = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+RELATIONSHIPS_NAMESPACE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+WORKSHEET_TYPE = RELATIONSHIPS_NAMESPACE + "/worksheet"
+WORKSHEET_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+STYLES_TYPE = RELATIONSHIPS_NAMESPACE + "/styles"
+STYLES_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"
+
+WORKBOOK_PART = "xl/workbook.xml"
+WORKBOOK_RELS_PART = "xl/_rels/workbook.xml.rels"
+STYLES_PART = "xl/styles.xml"
+CONTENT_TYPES_PART = "[Content_Types].xml"
+
+# the containers of a stylesheet in schema order, with the default children Excel writes when creating one, so the
+# first font, fill, border and cell format keep their usual meaning
+STYLE_CONTAINERS = (
+    ("numFmts", None),
+    ("fonts", '<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'),
+    ("fills", '<fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill>'),
+    ("borders", '<border><left/><right/><top/><bottom/><diagonal/></border>'),
+    ("cellStyleXfs", '<xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>'),
+    ("cellXfs", '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'),
+    ("cellStyles", '<cellStyle name="Normal" xfId="0" builtinId="0"/>'),
+)
+
+
+def write_worksheet(xlsx_file: str, sheet_name: str, cell_styles: dict[str: dict],
+                    render: Callable[[dict[str: int]], str]) -> None:
+    """
+    Writes a worksheet into the package of an existing .xlsx file, replacing the worksheet of the same name if there
+    is one. Only the workbook, its relationships, the content types and the styles are edited, every other part of
+    the package, including every other worksheet, is copied through unchanged.
+    :param xlsx_file: the .xlsx file
+    :param sheet_name: the name of the worksheet
+    :param cell_styles: a dictionary of style key to a named cell style, see _register_styles
+    :param render: called with a dictionary of style key to cell style id, returns the worksheet xml
+    """
+    with zipfile.ZipFile(xlsx_file, 'r') as package:
+        names = set(package.namelist())
+        missing = [name for name in (WORKBOOK_PART, WORKBOOK_RELS_PART, CONTENT_TYPES_PART) if name not in names]
+        if missing:
+            raise ValueError(f"not an .xlsx workbook, missing {', '.join(missing)}")
+
+        parts = {name: package.read(name).decode('utf-8')
+                 for name in (WORKBOOK_PART, WORKBOOK_RELS_PART, CONTENT_TYPES_PART)}
+
+        styles_part = _find_styles(parts)
+        if styles_part is not None and styles_part in names:
+            parts[styles_part] = package.read(styles_part).decode('utf-8')
+        else:  # a workbook without a stylesheet, which is optional
+            styles_part = _add_styles(parts, styles_part)
+
+        parts[styles_part], style_ids = _register_styles(parts[styles_part], cell_styles)
+        sheet_part = _find_worksheet(parts, sheet_name)
+        if sheet_part is None:
+            sheet_part = _add_worksheet(parts, sheet_name, package.namelist())
+        parts[sheet_part] = render(style_ids)
+
+        # the replaced worksheet's own relationships, such as drawings, no longer apply
+        dropped = {posixpath.join(posixpath.dirname(sheet_part), "_rels", posixpath.basename(sheet_part) + ".rels")}
+
+        # write next to the original so the original is only replaced once the new package is complete
+        handle, temporary_file = tempfile.mkstemp(suffix='.xlsx', dir=os.path.dirname(os.path.abspath(xlsx_file)))
+        os.close(handle)
+        try:
+            with zipfile.ZipFile(temporary_file, 'w', zipfile.ZIP_DEFLATED) as output:
+                for item in package.infolist():
+                    if item.filename in parts:
+                        output.writestr(item, parts.pop(item.filename).encode('utf-8'))
+                    elif item.filename not in dropped:
+                        output.writestr(item, package.read(item.filename))
+
+                for name, xml in parts.items():  # the new worksheet, and the new stylesheet if there was none
+                    output.writestr(name, xml.encode('utf-8'))
+        except BaseException:
+            os.remove(temporary_file)
+            raise
+
+    os.replace(temporary_file, xlsx_file)
+
+
+def _attributes(tag: str) -> dict[str: str]:
+    return {key.split(':')[-1]: value for key, value in re.findall(r'([\w:]+)="([^"]*)"', tag)}
+
+
+def _children(xml: str, container: str, child: str) -> list[str]:
+    """
+    The child elements of the first container element, as xml strings.
+    """
+    block = re.search(rf'<(?:\w+:)?{container}\b[^>]*?(?:/>|>(.*?)</(?:\w+:)?{container}>)', xml, re.DOTALL)
+    if block is None or block.group(1) is None:
+        return []
+
+    return re.findall(rf'<(?:\w+:)?{child}\b[^>]*?(?:/>|>.*?</(?:\w+:)?{child}>)', block.group(1), re.DOTALL)
+
+
+def _append_children(xml: str, container: str, child: str, children: list[str]) -> str:
+    """
+    Appends child elements to a container element, updating its count attribute.
+    """
+    block = re.search(rf'<((?:\w+:)?){container}\b([^>]*?)(/?)>', xml)
+    prefix, attributes, empty = block.groups()
+    count = len(_children(xml, container, child)) + len(children)
+    attributes = re.sub(r'\s*count="\d*"', '', attributes)
+    opening = f'<{prefix}{container} count="{count}"{attributes}>'
+
+    if empty:
+        return xml[:block.start()] + opening + "".join(children) + f'</{prefix}{container}>' + xml[block.end():]
+
+    closing = xml.index(f'</{prefix}{container}>', block.end())
+    return xml[:block.start()] + opening + xml[block.end():closing] + "".join(children) + xml[closing:]
+
+
+def _register_styles(styles_xml: str, cell_styles: dict[str: dict]) -> tuple[str, dict[str: int]]:
+    """
+    Adds named cell styles to the stylesheet, reusing the ones added by an earlier run.
+    :param styles_xml: the stylesheet of the workbook
+    :param cell_styles: a dictionary of style key to a named cell style, a dictionary of its "name", and optionally
+    "bold", "center", "color" and "fill", colors as ARGB hex strings
+    :return: the stylesheet and a dictionary of style key to cell style id
+    """
+    styles_xml = _ensure_style_containers(styles_xml)
+
+    # the cell style ids of the named styles already in the workbook
+    named_xf_ids = {attributes["name"]: attributes.get("xfId") for attributes in
+                    map(_attributes, _children(styles_xml, "cellStyles", "cellStyle")) if "name" in attributes}
+    cell_xf_ids = [_attributes(re.match(r'<[^>]*>', xf).group(0)).get("xfId")
+                   for xf in _children(styles_xml, "cellXfs", "xf")]
+
+    style_ids = {}
+    for key, cell_style in cell_styles.items():
+        xf_id = named_xf_ids.get(cell_style["name"])
+        if xf_id is not None and xf_id in cell_xf_ids:
+            style_ids[key] = cell_xf_ids.index(xf_id)
+    missing = {key: cell_style for key, cell_style in cell_styles.items() if key not in style_ids}
+    if not missing:
+        return styles_xml, style_ids
+
+    # new styles are based on the default font of the workbook
+    fonts = _children(styles_xml, "fonts", "font")
+    default_font = re.sub(r'<(?:\w+:)?(?:b|color)\b[^>]*/>', '', fonts[0]) if fonts else '<font><sz val="11"/></font>'
+    font_body = re.sub(r'^<[^>]*?/?>|</[^>]*>$', '', default_font)
+    font_count, fill_count = len(fonts), len(_children(styles_xml, "fills", "fill"))
+    named_count = len(_children(styles_xml, "cellStyleXfs", "xf"))
+    cell_count = len(cell_xf_ids)
+
+    new_fonts, new_fills, new_named_xfs, new_cell_styles, new_cell_xfs = [], [], [], [], []
+    for key, cell_style in missing.items():
+        font = ("<b/>" if cell_style.get("bold") else "") + \
+               (f'<color rgb="{cell_style["color"]}"/>' if "color" in cell_style else "")
+        new_fonts.append(f"<font>{font}{font_body}</font>")
+        font_id = font_count + len(new_fonts) - 1
+
+        fill_id = 0
+        if "fill" in cell_style:
+            new_fills.append(f'<fill><patternFill patternType="solid"><fgColor rgb="{cell_style["fill"]}"/>'
+                             f'<bgColor rgb="{cell_style["fill"]}"/></patternFill></fill>')
+            fill_id = fill_count + len(new_fills) - 1
+
+        alignment = '<alignment horizontal="center"/>' if cell_style.get("center") else ''
+        xf = f'numFmtId="0" fontId="{font_id}" fillId="{fill_id}" borderId="0" applyFont="1"' + \
+             (' applyFill="1"' if fill_id else '') + (' applyAlignment="1"' if alignment else '')
+
+        new_named_xfs.append(f'<xf {xf}>{alignment}</xf>')
+        xf_id = named_count + len(new_named_xfs) - 1
+        new_cell_styles.append(f'<cellStyle name={quoteattr(cell_style["name"])} xfId="{xf_id}"/>')
+        new_cell_xfs.append(f'<xf {xf} xfId="{xf_id}">{alignment}</xf>')
+        style_ids[key] = cell_count + len(new_cell_xfs) - 1
+
+    styles_xml = _append_children(styles_xml, "fonts", "font", new_fonts)
+    if new_fills:
+        styles_xml = _append_children(styles_xml, "fills", "fill", new_fills)
+    styles_xml = _append_children(styles_xml, "cellStyleXfs", "xf", new_named_xfs)
+    styles_xml = _append_children(styles_xml, "cellXfs", "xf", new_cell_xfs)
+    styles_xml = _append_children(styles_xml, "cellStyles", "cellStyle", new_cell_styles)
+
+    return styles_xml, style_ids
+
+
+def _ensure_style_containers(styles_xml: str) -> str:
+    """
+    Adds the style containers a stylesheet is missing, as every one of them is optional, each with its defaults.
+    """
+    opening = re.search(r'<((?:\w+:)?)styleSheet\b[^>]*?(/?)>', styles_xml)
+    prefix, empty = opening.groups()
+    if empty:
+        styles_xml = styles_xml[:opening.end() - 2] + f'></{prefix}styleSheet>' + styles_xml[opening.end():]
+
+    for position, (container, defaults) in enumerate(STYLE_CONTAINERS):
+        if defaults is None or re.search(rf'<(?:\w+:)?{container}\b', styles_xml):
+            continue
+
+        # before the first container that follows it in schema order, or at the end of the stylesheet
+        later = [match.start() for match in
+                 (re.search(rf'<(?:\w+:)?{name}\b', styles_xml) for name, _ in STYLE_CONTAINERS[position + 1:])
+                 if match is not None]
+        end = re.search(rf'</(?:\w+:)?styleSheet>', styles_xml).start()
+        index = min(later, default=end)
+
+        # the default children carry no prefix, so a prefixed stylesheet gets them in the default namespace
+        count = len(re.findall(r'<(?:font|fill|border|xf|cellStyle)\b', defaults))
+        element = f'<{container} xmlns="{MAIN_NAMESPACE}" count="{count}">{defaults}</{container}>' if prefix else \
+            f'<{container} count="{count}">{defaults}</{container}>'
+        styles_xml = styles_xml[:index] + element + styles_xml[index:]
+
+    return styles_xml
+
+
+def _find_styles(parts: dict[str: str]):
+    """
+    The part name of the stylesheet of the workbook, or None if the workbook has none.
+    """
+    for relationship in re.findall(r'<(?:\w+:)?Relationship\b[^>]*>', parts[WORKBOOK_RELS_PART]):
+        relationship = _attributes(relationship)
+        if relationship.get("Type") == STYLES_TYPE:
+            return _part_name(relationship["Target"])
+
+    return None
+
+
+def _add_styles(parts: dict[str: str], styles_part: str = None) -> str:
+    """
+    Adds an empty stylesheet, registering it with the workbook relationships and the content types unless the
+    relationships already name it.
+    :return: the part name of the stylesheet
+    """
+    if styles_part is None:
+        styles_part = STYLES_PART
+        relationship_ids = set(re.findall(r'\bId="([^"]*)"', parts[WORKBOOK_RELS_PART]))
+        number = 1
+        while f"rId{number}" in relationship_ids:
+            number += 1
+        parts[WORKBOOK_RELS_PART] = _insert_before(parts[WORKBOOK_RELS_PART], "Relationships",
+                                                   f'<Relationship Id="rId{number}" Type="{STYLES_TYPE}" '
+                                                   f'Target="/{styles_part}"/>')
+
+    if f'PartName="/{styles_part}"' not in parts[CONTENT_TYPES_PART]:
+        parts[CONTENT_TYPES_PART] = _insert_before(parts[CONTENT_TYPES_PART], "Types",
+                                                   f'<Override PartName="/{styles_part}" '
+                                                   f'ContentType="{STYLES_CONTENT_TYPE}"/>')
+
+    parts[styles_part] = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' \
+                         f'<styleSheet xmlns="{MAIN_NAMESPACE}"></styleSheet>'
+    return styles_part
+
+
+def _find_worksheet(parts: dict[str: str], sheet_name: str):
+    """
+    The part name of the worksheet named sheet_name, or None if the workbook has no such worksheet.
+    """
+    for sheet in re.findall(r'<(?:\w+:)?sheet\b[^>]*>', parts[WORKBOOK_PART]):
+        attributes = _attributes(sheet)
+        if attributes.get("name") == escape(sheet_name, {'"': "&quot;"}):
+            for relationship in re.findall(r'<(?:\w+:)?Relationship\b[^>]*>', parts[WORKBOOK_RELS_PART]):
+                relationship = _attributes(relationship)
+                if relationship.get("Id") == attributes.get("id"):
+                    return _part_name(relationship["Target"])
+
+    return None
+
+
+def _add_worksheet(parts: dict[str: str], sheet_name: str, part_names: list[str]) -> str:
+    """
+    Adds an empty worksheet named sheet_name after the last worksheet, registering it with the workbook, its
+    relationships and the content types.
+    :return: the part name of the new worksheet
+    """
+    number = 1
+    while f"xl/worksheets/sheet{number}.xml" in part_names:
+        number += 1
+    sheet_part = f"xl/worksheets/sheet{number}.xml"
+
+    relationship_ids = set(re.findall(r'\bId="([^"]*)"', parts[WORKBOOK_RELS_PART]))
+    number = 1
+    while f"rId{number}" in relationship_ids:
+        number += 1
+    relationship_id = f"rId{number}"
+
+    sheet_ids = [int(sheet_id) for sheet_id in re.findall(r'<(?:\w+:)?sheet\b[^>]*\bsheetId="(\d+)"',
+                                                          parts[WORKBOOK_PART])]
+
+    parts[WORKBOOK_RELS_PART] = _insert_before(parts[WORKBOOK_RELS_PART], "Relationships",
+                                               f'<Relationship Id="{relationship_id}" Type="{WORKSHEET_TYPE}" '
+                                               f'Target="/{sheet_part}"/>')
+    parts[CONTENT_TYPES_PART] = _insert_before(parts[CONTENT_TYPES_PART], "Types",
+                                               f'<Override PartName="/{sheet_part}" '
+                                               f'ContentType="{WORKSHEET_CONTENT_TYPE}"/>')
+
+    # use the workbook's own prefixes, declaring the relationships namespace on the sheet if the workbook doesn't
+    prefix = re.search(r'</((?:\w+:)?)sheets>', parts[WORKBOOK_PART]).group(1)
+    relationships_prefix = re.search(rf'xmlns:(\w+)="{re.escape(RELATIONSHIPS_NAMESPACE)}"', parts[WORKBOOK_PART])
+    if relationships_prefix is None:
+        id_attribute = f'xmlns:r="{RELATIONSHIPS_NAMESPACE}" r:id="{relationship_id}"'
+    else:
+        id_attribute = f'{relationships_prefix.group(1)}:id="{relationship_id}"'
+
+    parts[WORKBOOK_PART] = _insert_before(parts[WORKBOOK_PART], "sheets",
+                                          f'<{prefix}sheet name={quoteattr(sheet_name)} '
+                                          f'sheetId="{max(sheet_ids, default=0) + 1}" {id_attribute}/>')
+
+    return sheet_part
+
+
+def _insert_before(xml: str, container: str, element: str) -> str:
+    closing = re.search(rf'</(?:\w+:)?{container}>', xml)
+    return xml[:closing.start()] + element + xml[closing.start():]
+
+
+def _part_name(target: str) -> str:
+    """
+    Converts a relationship target of the workbook to a part name of the package.
+    """
+    if target.startswith('/'):
+        return target[1:]
+
+    return posixpath.normpath(posixpath.join("xl", target))
@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+from openpyxl import Workbook
+
+# the modules live flat in src and import each other as siblings
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+HEADER = ("Armband Number", "Handler", "Call Name", "Class", "Score", "Group", "Champion")
+ENTRIES = [
+    (101, "Ann", "Rex", "Open B", 198, "Working", None),
+    (102, "Bob", "Max", "Open B", "195+", "Herding", "CH"),
+    (101, "Ann", "Rex", "Utility B", 197, "Working", None),
+    (103, "Cat", "Pip", "Utility B", 199, "Toy", None),
+    (102, "Bob", "Max", "Utility B", 190, "Herding", "CH"),
+    (104, "Dan", "Bo", "Novice A", "193++", "Hound", None),
+    (105, "Eve", "Sky", "Beginner Novice", 196, "Sporting", None),
+]
+
+
+@pytest.fixture(autouse=True)
+def working_directory(tmp_path, monkeypatch):
+    """
+    Runs each test in its own directory, where the settings file is created.
+    """
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def trial_file(tmp_path) -> str:
+    """
+    A small obedience trial workbook.
+    """
+    workbook = Workbook()
+    workbook.active.title = "Entries"
+    workbook.active.append(HEADER)
+    for entry in ENTRIES:
+        workbook.active.append(entry)
+
+    trial_file = str(tmp_path / "trial.xlsx")
+    workbook.save(trial_file)
+    return trial_file
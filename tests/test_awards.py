@@ -0,0 +1,105 @@
+import pandas
+import pytest
+
+from calculator import DEFAULT_SETTINGS, augment_data, find_awards
+from conftest import HEADER
+from ingest import find_feature_names
+from ranking import sort_contestants
+
+RALLY_HEADER = HEADER[:5]
+
+HIGH_COMBINED = "High Combined (Open B + Utility B)"
+HIGH_COMBINED_PREFERRED = "High Combined Preferred (Preferred Open + Preferred Utility)"
+RALLY_HIGH_COMBINED = "High Combined (Rally Excellent B + Rally Advanced B)"
+HIGH_TRIPLE = "High Triple (High Combined + Rally Master)"
+
+
+def awards_of(entries: list[tuple], competition_type: str = "obedience", break_tie: bool = False) -> dict:
+    """
+    The winners of every award of a trial, as the sorted call names of the winners and their score.
+    """
+    data = pandas.DataFrame(entries, columns=HEADER if competition_type == "obedience" else RALLY_HEADER)
+    column_names = find_feature_names(data.columns, competition_type)
+    contestants = augment_data(data, column_names, DEFAULT_SETTINGS["class hierarchy"])
+    awards = find_awards(contestants, sort_contestants(contestants), column_names, competition_type, break_tie)
+
+    return {award: (sorted(winners[column_names["call name"]]),
+                    winners[column_names["score"]].iloc[0] if winners.shape[0] else None)
+            for award, winners in awards}
+
+
+def test_one_entry_needed_in_each_category():
+    awards = awards_of([
+        (101, "Ann", "Rex", "Open B", 190, "Working", None),
+        (101, "Ann", "Rex", "Utility B", 190, "Working", None),
+        (103, "Cat", "Pip", "Utility B", 200, "Toy", None),
+        (103, "Cat", "Pip", "Utility B 2", 200, "Toy", None),
+    ])
+
+    assert awards[HIGH_COMBINED] == (["Rex"], 380)
+
+
+def test_best_score_of_each_category_is_summed():
+    awards = awards_of([
+        (101, "Ann", "Rex", "Open B", 198, "Working", None),
+        (101, "Ann", "Rex", "Open B 2", 190, "Working", None),
+        (101, "Ann", "Rex", "Utility B", 197, "Working", None),
+        (102, "Bob", "Max", "Open B", 196, "Herding", None),
+        (102, "Bob", "Max", "Utility B", 196, "Herding", None),
+    ])
+
+    assert awards[HIGH_COMBINED] == (["Rex"], 395)
+
+
+def test_high_combined_preferred_counts_preferred_classes_only():
+    awards = awards_of([
+        (101, "Ann", "Rex", "Open B", 198, "Working", None),
+        (101, "Ann", "Rex", "Utility B", 197, "Working", None),
+        (102, "Bob", "Max", "Preferred Open", 195, "Herding", None),
+        (102, "Bob", "Max", "Preferred Utility", 190, "Herding", None),
+        (103, "Cat", "Pip", "Open B", 199, "Toy", None),
+        (103, "Cat", "Pip", "Preferred Utility", 199, "Toy", None),
+    ])
+
+    assert awards[HIGH_COMBINED] == (["Rex"], 395)
+    assert awards[HIGH_COMBINED_PREFERRED] == (["Max"], 385)
+    # preferred classes are not eligible for the single score awards either
+    assert awards["High in Trial (All Classes)"] == (["Pip"], 199)
+
+
+def test_high_triple_needs_a_master_entry():
+    awards = awards_of([
+        (101, "Ann", "Rex", "Rally Excellent B", 100),
+        (101, "Ann", "Rex", "Rally Advanced B", 99),
+        (102, "Bob", "Max", "Rally Excellent B", 90),
+        (102, "Bob", "Max", "Rally Advanced B", 90),
+        (102, "Bob", "Max", "Rally Master", 90),
+    ], "rally")
+
+    assert awards[RALLY_HIGH_COMBINED] == (["Rex"], 199)
+    assert awards[HIGH_TRIPLE] == (["Max"], 270)
+
+    awards = awards_of([
+        (101, "Ann", "Rex", "Rally Excellent B", 100),
+        (101, "Ann", "Rex", "Rally Advanced B", 99),
+    ], "rally")
+
+    assert awards[HIGH_TRIPLE] == ([], None)
+
+
+@pytest.mark.parametrize("break_tie, winners", [(False, ["Max", "Rex"]), (True, ["Max"])])
+def test_combined_tie(break_tie, winners):
+    # tied on 395, Max has the best utility score, the highest class
+    awards = awards_of([
+        (101, "Ann", "Rex", "Open B", 198, "Working", None),
+        (101, "Ann", "Rex", "Utility B", 197, "Working", None),
+        (102, "Bob", "Max", "Open B", 196, "Herding", None),
+        (102, "Bob", "Max", "Utility B", 199, "Herding", None),
+    ], break_tie=break_tie)
+
+    assert awards[HIGH_COMBINED] == (winners, 395)
+
+
+def test_unknown_competition_type():
+    with pytest.raises(ValueError):
+        awards_of([(101, "Ann", "Rex", "Rally Master", 100)], "agility")
@@ -0,0 +1,28 @@
+import os
+
+import pandas
+from openpyxl import load_workbook
+
+from batch import calculate_batch, output_path
+from conftest import HEADER, ENTRIES
+
+
+def test_output_path():
+    assert output_path(os.path.join("trials", "a.xlsx")) == os.path.join("trials", "a.xlsx")
+    assert output_path(os.path.join("trials", "a.csv")) == os.path.join("trials", "a_scores.xlsx")
+    assert output_path(os.path.join("trials", "a.PARQUET")) == os.path.join("trials", "a_scores.xlsx")
+    assert output_path(os.path.join("trials", "a.csv"), "out") == os.path.join("out", "a_scores.xlsx")
+
+
+def test_default_output_of_mixed_inputs(tmp_path, trial_file):
+    directory = tmp_path / "trials"
+    directory.mkdir()
+    os.replace(trial_file, directory / "b.xlsx")
+    pandas.DataFrame(ENTRIES, columns=HEADER).to_csv(directory / "a.csv", index=False)
+
+    results = calculate_batch(str(directory), 'obedience', workers=1, use_cache=False)
+
+    assert [(os.path.basename(result.input_file), os.path.basename(result.output_file), result.status)
+            for result in results] == [("a.csv", "a_scores.xlsx", True), ("b.xlsx", "b.xlsx", True)]
+    assert load_workbook(directory / "a_scores.xlsx").active["B1"].value == "Open B"
+    assert load_workbook(directory / "b.xlsx").sheetnames[-1] == "Winners"
@@ -0,0 +1,40 @@
+from benchmark import canonical_results, scale_of, SCALES
+
+HEADER = [None, "Armband Number", "Handler", "Call Name", "Score"]
+AWARDS_HEADER = [None, "Armband Number", "Handler", "Call Name", None]
+
+
+def worksheet(placements: list[list], award: list[list]) -> list[list]:
+    return [[None, "Open B", None, None, None], HEADER] + \
+        [[place] + row for place, row in enumerate(placements, 1)] + [[None] * 5, AWARDS_HEADER] + \
+        [["High in Trial (All Classes)" if number == 0 else None] + row for number, row in enumerate(award)]
+
+
+REX = [101, "Ann", "Rex", "200"]
+MAX = [102, "Bob", "Max", "200"]
+PIP = [103, "Cat", "Pip", "199+"]
+BO = [104, "Dan", "Bo", "199+"]
+SKY = [105, "Eve", "Sky", "199+"]
+
+
+def test_tied_rows_in_any_order():
+    assert canonical_results(worksheet([REX, MAX, PIP], [REX, MAX])) == \
+           canonical_results(worksheet([MAX, REX, PIP], [MAX, REX]))
+
+    # which of the contestants tied for the last place fill it is a matter of order too
+    assert canonical_results(worksheet([REX, MAX, PIP, BO], [REX])) == \
+           canonical_results(worksheet([REX, MAX, SKY, PIP], [REX]))
+
+
+def test_untied_rows_keep_their_order():
+    assert canonical_results(worksheet([REX, PIP], [REX])) != canonical_results(worksheet([PIP, REX], [REX]))
+    assert canonical_results(worksheet([REX, MAX, PIP], [REX])) != \
+           canonical_results(worksheet([REX, MAX, BO], [REX]))
+    assert canonical_results(worksheet([REX, MAX], [REX])) != canonical_results(worksheet([REX, MAX], [REX, MAX]))
+    assert canonical_results(worksheet([REX, MAX], [REX])) != canonical_results(worksheet([REX, MAX], [MAX]))
+
+
+def test_scale_of_entries():
+    assert [scale_of(entries) for entries, _, _ in SCALES] == list(SCALES)
+    assert scale_of(10) == (10, *SCALES[0][1:])
+    assert scale_of(2000) == (2000, *SCALES[1][1:])
@@ -0,0 +1,50 @@
+import os
+
+import pandas
+
+import cache
+from cache import ResultCache, cache_key
+from calculator import calculate
+
+
+def test_unreadable_entries_are_misses(tmp_path):
+    result_cache = ResultCache(str(tmp_path / "cache"))
+    result_cache.put("good", {"awards": []})
+    assert result_cache.get("good") == {"awards": []}
+
+    # pickles of results from another version can fail to load with errors other than UnpicklingError
+    for key, data in (("empty", b""), ("truncated", b"\x80\x05\x95"), ("garbage", b"not a pickle"),
+                      ("missing module", b"cno_such_module\nName\n."), ("missing class", b"cpickle\nNoSuchClass\n.")):
+        with open(result_cache._path(key), 'wb') as f:
+            f.write(data)
+        assert result_cache.get(key) is None, key
+
+    os.mkdir(result_cache._path("directory"))
+    assert result_cache.get("directory") is None
+
+
+def test_unusable_directory_skips_the_cache(tmp_path):
+    blocker = tmp_path / "cache"
+    blocker.write_text("a file where the cache directory should be")
+
+    result_cache = ResultCache(str(blocker / "results"))
+    assert result_cache.get("key") is None
+    result_cache.put("key", {"awards": []})
+    assert result_cache.get("key") is None
+
+
+def test_calculate_without_a_usable_cache(trial_file, tmp_path):
+    (tmp_path / "cache").write_text("a file where the cache directory should be")
+
+    output_file = str(tmp_path / "trial_scores.xlsx")
+    assert calculate(trial_file, output_file, 'obedience', use_cache=True)
+    assert not calculate(trial_file, output_file, 'obedience', use_cache=True).cached
+
+
+def test_key_changes_with_the_rules(monkeypatch):
+    data = pandas.DataFrame({"Class": ["Open B"], "Score": [198]})
+    column_names = {"class": "Class", "score": "Score"}
+    key = cache_key(data, column_names, 'obedience', True, ["utility", "open", "novice"])
+
+    monkeypatch.setattr(cache, "RESULTS_VERSION", cache.RESULTS_VERSION + 1)
+    assert cache_key(data, column_names, 'obedience', True, ["utility", "open", "novice"]) != key
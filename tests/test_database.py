@@ -0,0 +1,36 @@
+import os
+import datetime
+
+from calculator import calculate
+from database import ResultsDatabase
+
+
+def set_modified(path: str, date: str) -> None:
+    timestamp = datetime.datetime.fromisoformat(date + "T12:00").timestamp()
+    os.utime(path, (timestamp, timestamp))
+
+
+def test_in_place_reruns_keep_one_trial(trial_file, tmp_path):
+    database_file = str(tmp_path / "results.db")
+    set_modified(trial_file, "2024-05-04")
+
+    calculate(trial_file, trial_file, 'obedience', database_file=database_file)
+    calculate(trial_file, trial_file, 'obedience', database_file=database_file)
+    set_modified(trial_file, "2024-05-05")  # corrected the next day
+    calculate(trial_file, trial_file, 'obedience', database_file=database_file)
+
+    with ResultsDatabase(database_file) as database:
+        trials = database.connection.execute("SELECT trial_date, competition_type FROM trials").fetchall()
+        assert trials == [("2024-05-05", "obedience")]
+        assert database.award_counts("High in Trial%")["wins"].tolist() == [1]
+
+
+def test_trial_date_is_read_before_writing(trial_file, tmp_path):
+    database_file = str(tmp_path / "results.db")
+    set_modified(trial_file, "2024-05-04")
+
+    calculate(trial_file, trial_file, 'obedience', database_file=database_file)
+
+    with ResultsDatabase(database_file) as database:
+        assert database.connection.execute("SELECT trial_date FROM trials").fetchall() == [("2024-05-04",)]
+
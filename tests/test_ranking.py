@@ -0,0 +1,102 @@
+import pandas
+import pytest
+
+from calculator import DEFAULT_SETTINGS, augment_data, find_awards
+from conftest import HEADER
+from ingest import find_feature_names
+from ranking import sort_contestants, class_placements, group_highs, class_category_index, award_eligible, class_ranks
+
+HIERARCHY = DEFAULT_SETTINGS["class hierarchy"]
+
+
+def ranked_trial(entries: list[tuple]) -> tuple[pandas.DataFrame, dict]:
+    """
+    The contestants of an obedience trial, cleaned and sorted, with the column names.
+    """
+    data = pandas.DataFrame(entries, columns=HEADER)
+    column_names = find_feature_names(data.columns, 'obedience')
+    return sort_contestants(augment_data(data, column_names, HIERARCHY)), column_names
+
+
+def highs_of(entries: list[tuple], break_tie: bool) -> dict:
+    ranked, column_names = ranked_trial(entries)
+    eligible = award_eligible(class_category_index(ranked[column_names["class"]]))
+    return {group: winners["Call Name"].tolist()
+            for group, winners in group_highs(ranked, column_names, eligible, break_tie).items()}
+
+
+def test_top_four_placements_with_ties_on_pluses():
+    ranked, column_names = ranked_trial([
+        (101, "Ann", "Rex", "Open B", 197, "Working", None),
+        (102, "Bob", "Max", "Open B", "197++", "Herding", None),
+        (103, "Cat", "Pip", "Open B", 196, "Toy", None),
+        (104, "Dan", "Bo", "Open B", "197+", "Hound", None),
+        (105, "Eve", "Sky", "Open B", 198, "Sporting", None),
+        (106, "Fay", "Ace", "Open B", 197, "Terrier", None),
+        (107, "Gus", "Kit", "Open B", "NQ", "Toy", None),
+        (108, "Hal", "Zed", "Utility B", 190, "Toy", None),
+    ])
+    placements = class_placements(ranked, column_names)
+
+    assert list(placements) == ["Open B", "Utility B"]
+    # more pluses place higher, the remaining tie keeps its entry order
+    assert placements["Open B"]["Call Name"].tolist() == ["Sky", "Max", "Bo", "Rex"]
+    assert placements["Utility B"]["Call Name"].tolist() == ["Zed"]
+
+
+def test_group_highs_break_ties_on_pluses_within_a_class():
+    entries = [
+        (101, "Ann", "Rex", "Open B", "197", "Herding", None),
+        (102, "Bob", "Max", "Open B", "197+", "Herding", None),
+        (103, "Cat", "Pip", "Open B", "195", "Herding", None),
+    ]
+
+    assert highs_of(entries, break_tie=False) == {"Herding": ["Max"]}
+    assert highs_of(entries, break_tie=True) == {"Herding": ["Max"]}
+
+
+def test_tie_in_several_classes_stays_unbroken():
+    entries = [
+        (101, "Ann", "Rex", "Open B", "198++", "Working", None),
+        (102, "Bob", "Max", "Utility B", "198", "Working", None),
+        (103, "Cat", "Pip", "Novice A", "190", "Working", None),
+    ]
+
+    # without breaking ties by class, neither the class nor the pluses decide between classes
+    assert highs_of(entries, break_tie=False) == {"Working": ["Rex", "Max"]}
+    assert highs_of(entries, break_tie=True) == {"Working": ["Max"]}
+
+    ranked, column_names = ranked_trial(entries)
+    for break_tie, winners in ((False, ["Rex", "Max"]), (True, ["Max"])):
+        awards = dict(find_awards(ranked.sort_index(), ranked, column_names, 'obedience', break_tie))
+        assert awards["High in Trial (All Classes)"]["Call Name"].tolist() == winners
+
+
+@pytest.mark.parametrize("break_tie", [False, True])
+def test_beginner_and_preferred_classes_are_excluded(break_tie):
+    ranked, column_names = ranked_trial([
+        (101, "Ann", "Rex", "Beginner Novice", 200, "Toy", "Ch"),
+        (102, "Bob", "Max", "Preferred Open", 199, "Toy", "Ch"),
+        (103, "Cat", "Pip", "Novice A", 190, "Toy", "Ch"),
+    ])
+
+    awards = dict(find_awards(ranked.sort_index(), ranked, column_names, 'obedience', break_tie))
+    assert awards["High in Trial (All Classes)"]["Call Name"].tolist() == ["Pip"]
+    assert awards["High Scoring Champion of Record"]["Call Name"].tolist() == ["Pip"]
+    assert awards["Toy"]["Call Name"].tolist() == ["Pip"]
+    # excluded classes still place in their own class
+    assert class_placements(ranked, column_names)["Beginner Novice"]["Call Name"].tolist() == ["Rex"]
+
+
+def test_class_rank_of_a_class_outside_the_hierarchy():
+    classes = pandas.Series(["Utility B", "Graduate Open", "Versatility", "Novice A", "Versatility"])
+    assert class_ranks(classes, HIERARCHY).tolist() == [3, 2, 0, 1, 0]
+
+    # a class outside the hierarchy places last in a tie on score and pluses
+    entries = [
+        (101, "Ann", "Rex", "Versatility", 195, "Working", None),
+        (102, "Bob", "Max", "Novice A", 195, "Working", None),
+    ]
+    ranked, column_names = ranked_trial(entries)
+    assert ranked["Call Name"].tolist() == ["Max", "Rex"]
+    assert highs_of(entries, break_tie=True) == {"Working": ["Max"]}
@@ -0,0 +1,165 @@
+import io
+import os
+import json
+import socket
+import asyncio
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import service
+from service import ScoringService, XLSX_CONTENT_TYPE
+from conftest import HEADER, ENTRIES
+
+
+@pytest.fixture(scope='module')
+def scoring_service(tmp_path_factory):
+    """
+    A service with one worker, running on its own event loop in a background thread.
+    """
+    directory = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("service"))  # where the settings file is created
+    try:
+        scoring_service = ScoringService(port=0, workers=1, max_queue=1, max_upload_megabytes=1)
+    finally:
+        os.chdir(directory)
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(scoring_service.start(), loop).result()
+
+    yield scoring_service
+
+    asyncio.run_coroutine_threadsafe(scoring_service.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def request(scoring_service, method: str, target: str, body: bytes = b"", content_type: str = None):
+    connection = http.client.HTTPConnection(service.HOST, scoring_service.port, timeout=60)
+    try:
+        connection.request(method, target, body, {} if content_type is None else {"Content-Type": content_type})
+        response = connection.getresponse()
+        return response.status, response.getheader("Content-Type"), response.read()
+    finally:
+        connection.close()
+
+
+def raw_request(scoring_service, data: bytes) -> int:
+    with socket.create_connection((service.HOST, scoring_service.port), timeout=60) as connection:
+        connection.sendall(data)
+        connection.shutdown(socket.SHUT_WR)
+        return int(connection.makefile('rb').readline().split()[1])
+
+
+def contestants_json(numeric_groups: bool = False) -> bytes:
+    contestants = [dict(zip(HEADER, entry)) for entry in ENTRIES]
+    if numeric_groups:
+        for number, contestant in enumerate(contestants):
+            contestant["Group"] = number % 3 + 1
+    return json.dumps(contestants).encode()
+
+
+def test_status(scoring_service):
+    status, content_type, body = request(scoring_service, "GET", "/status")
+    assert status == 200 and content_type == "application/json"
+    assert json.loads(body) == {"workers": 1, "running": 0, "queued": 0}
+
+
+def test_json_results(scoring_service):
+    status, content_type, body = request(scoring_service, "POST", "/calculate?competition_type=obedience",
+                                         contestants_json(), "application/json")
+    assert status == 200 and content_type == "application/json"
+
+    results = json.loads(body)
+    assert (results["rows"], results["contestants"]) == (len(ENTRIES), len(ENTRIES))
+    assert [class_["class"] for class_ in results["classes"]] == ["Open B", "Utility B", "Novice A",
+                                                                  "Beginner Novice"]
+    assert results["classes"][0]["placements"][:2] == [
+        {"number": 101, "handler": "Ann", "call name": "Rex", "score": "198"},
+        {"number": 102, "handler": "Bob", "call name": "Max", "score": "195+"}]
+    awards = {award["award"]: award["winners"] for award in results["awards"]}
+    assert [winner["call name"] for winner in awards["High Combined (Open B + Utility B)"]] == ["Rex"]
+
+
+def test_numeric_groups(scoring_service):
+    status, _, body = request(scoring_service, "POST", "/calculate?competition_type=obedience",
+                              contestants_json(numeric_groups=True), "application/json; charset=utf-8")
+    assert status == 200, body
+    awards = [award["award"] for award in json.loads(body)["awards"]]
+    assert {1, 2, 3} <= set(awards)
+
+
+def test_xlsx_upload(scoring_service):
+    workbook = Workbook()
+    workbook.active.append(HEADER)
+    for entry in ENTRIES:
+        workbook.active.append(entry)
+    upload = io.BytesIO()
+    workbook.save(upload)
+
+    status, content_type, body = request(scoring_service, "POST",
+                                         "/calculate?competition_type=obedience&break_tie=1&format=xlsx",
+                                         upload.getvalue(), XLSX_CONTENT_TYPE)
+    assert status == 200 and content_type == XLSX_CONTENT_TYPE
+    assert load_workbook(io.BytesIO(body)).active["B1"].value == "Open B"
+
+
+@pytest.mark.parametrize("target, body, content_type, expected", [
+    ("/calculate?competition_type=agility", b"[]", "application/json", 400),
+    ("/calculate?competition_type=obedience&format=pdf", b"[]", "application/json", 400),
+    ("/calculate?competition_type=obedience", b"[]", "text/plain", 415),
+    ("/calculate?competition_type=obedience", b"{not json", "application/json", 422),
+    ("/calculate?competition_type=obedience", b'{"contestants": 1}', "application/json", 422),
+    ("/calculate?competition_type=obedience", b'[{"Name": "Rex"}]', "application/json", 422),
+    ("/calculate?competition_type=obedience", b"not a zip", XLSX_CONTENT_TYPE, 422),
+    ("/calculate?competition_type=obedience", b"x" * (4 * 1024 * 1024), "application/json", 413),
+    ("/missing", b"", None, 404),
+])
+def test_request_errors(scoring_service, target, body, content_type, expected):
+    status, content_type, response = request(scoring_service, "POST", target, body, content_type)
+    assert status == expected
+    assert content_type == "application/json" and "error" in json.loads(response)
+
+
+def test_malformed_requests(scoring_service):
+    assert request(scoring_service, "GET", "/calculate?competition_type=obedience")[0] == 405
+    assert request(scoring_service, "POST", "/status")[0] == 405
+    assert raw_request(scoring_service, b"GET /status\r\n\r\n") == 400
+    assert raw_request(scoring_service, b"GET /status HTTP/1.1\r\nHost\r\n\r\n") == 400
+    assert raw_request(scoring_service, b"POST /calculate HTTP/1.1\r\nContent-Length: x\r\n\r\n") == 400
+    assert raw_request(scoring_service, b"POST /calculate HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n") == 411
+    assert raw_request(scoring_service, b"POST /calculate HTTP/1.1\r\nContent-Length: 10\r\n\r\nshort") == 400
+
+
+def test_full_queue(scoring_service):
+    scoring_service.jobs = scoring_service.workers + scoring_service.max_queue
+    try:
+        status, _, body = request(scoring_service, "POST", "/calculate?competition_type=obedience",
+                                  contestants_json(), "application/json")
+    finally:
+        scoring_service.jobs = 0
+
+    assert status == 503 and "error" in json.loads(body)
+    assert request(scoring_service, "GET", "/status")[0] == 200
+
+
+def test_internal_errors(scoring_service, monkeypatch):
+    def failing_job(*args):
+        raise TypeError("a bug, not a bad upload")
+
+    # the job runs in a thread instead of a worker process, so it sees the patched run_job
+    monkeypatch.setattr(service, "run_job", failing_job)
+    executor, scoring_service.executor = scoring_service.executor, ThreadPoolExecutor(max_workers=1)
+    try:
+        status, _, body = request(scoring_service, "POST", "/calculate?competition_type=obedience",
+                                  contestants_json(), "application/json")
+    finally:
+        scoring_service.executor.shutdown()
+        scoring_service.executor = executor
+
+    assert status == 500 and "TypeError" in json.loads(body)["error"]
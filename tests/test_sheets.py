@@ -0,0 +1,58 @@
+import openpyxl
+import pytest
+from openpyxl import Workbook
+
+from conftest import HEADER, ENTRIES
+from sheets import calculate_sheets, main, MAX_SHEET_NAME
+
+LONG_NAME = "Saturday Ring Two Obedience Run"  # as long as Excel allows
+
+
+@pytest.fixture
+def workbook_file(tmp_path) -> str:
+    """
+    A workbook with a good trial, a trial without a score column and a trial with a long worksheet name.
+    """
+    workbook = Workbook()
+    workbook.active.title = "Friday"
+    missing_scores = workbook.create_sheet("No Scores")
+    long_name = workbook.create_sheet(LONG_NAME)
+
+    for worksheet in (workbook.active, long_name):
+        worksheet.append(HEADER)
+        for entry in ENTRIES:
+            worksheet.append(entry)
+    missing_scores.append(HEADER[:4])
+    for entry in ENTRIES:
+        missing_scores.append(entry[:4])
+
+    workbook_file = str(tmp_path / "weekend.xlsx")
+    workbook.save(workbook_file)
+    return workbook_file
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_every_worksheet_is_a_trial(workbook_file, tmp_path, workers):
+    output_file = str(tmp_path / "weekend_scores.xlsx")
+    results = calculate_sheets(workbook_file, output_file, 'obedience', workers=workers)
+
+    assert [(result.sheet_name, result.status) for result in results] == \
+           [("Friday", True), ("No Scores", False), (LONG_NAME, True)]
+    assert "no 'score' column detected" in results[1].error
+
+    truncated = LONG_NAME[:MAX_SHEET_NAME - len(" Winners")] + " Winners"
+    assert [result.winners_sheet for result in results] == ["Friday Winners", "", truncated]
+
+    workbook = openpyxl.load_workbook(output_file)
+    assert workbook.sheetnames == ["Summary", "Friday Winners", truncated]
+    assert [row[-1] for row in workbook["Summary"].iter_rows(min_row=2, values_only=True)] == \
+           ["Complete", f"Error: {results[1].error}", "Complete"]
+    assert list(workbook["Friday Winners"].iter_rows(values_only=True)) == \
+           list(workbook[truncated].iter_rows(values_only=True))
+
+
+def test_exit_code_counts_failures(workbook_file, tmp_path, capsys):
+    assert main([workbook_file, str(tmp_path / "weekend_scores.xlsx"), 'obedience', '-w', '1']) == 1
+    assert capsys.readouterr().out.splitlines()[-1] == "2 of 3 complete"
+
+    assert main([workbook_file, str(tmp_path / "weekend_scores.xlsx"), 'obedience', '-s', 'Friday']) == 0
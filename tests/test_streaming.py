@@ -0,0 +1,40 @@
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from calculator import calculate
+from conftest import HEADER, ENTRIES
+from streaming import calculate_streaming
+
+# ties at the best scores of the trial, the champions and the groups, and dogs entered in several combined classes
+TIED_ENTRIES = ENTRIES + [
+    (106, "Fay", "Ace", "Open B", 199, "Toy", "GCH"),
+    (106, "Fay", "Ace", "Utility B", "199+", "Toy", "GCH"),
+    (107, "Gus", "Kit", "Open A", "199++", "Hound", "CH"),
+    (108, "Hal", "Dot", "Preferred Open", 200, "Working", "CH"),
+    (108, "Hal", "Dot", "Preferred Utility", 198, "Working", "CH"),
+    (109, "Ivy", "Jax", "Novice B", 190, None, None),
+    (110, "Jon", "Zed", "Beginner Novice", "NQ", "Hound", None),
+]
+
+
+def winners_values(xlsx_file: str) -> list[tuple]:
+    return list(load_workbook(xlsx_file).active.iter_rows(values_only=True))
+
+
+@pytest.mark.parametrize("break_tie", [False, True])
+@pytest.mark.parametrize("chunk_rows", [1, 3, 1000])
+def test_streaming_matches_calculate(tmp_path, break_tie, chunk_rows):
+    workbook = Workbook()
+    workbook.active.append(HEADER)
+    for entry in TIED_ENTRIES * 3:
+        workbook.active.append(entry)
+    trial_file = str(tmp_path / "trial.xlsx")
+    workbook.save(trial_file)
+
+    expected_file, streamed_file = str(tmp_path / "expected.xlsx"), str(tmp_path / "streamed.xlsx")
+    expected = calculate(trial_file, expected_file, 'obedience', break_tie)
+    streamed = calculate_streaming(trial_file, streamed_file, 'obedience', break_tie, chunk_rows=chunk_rows)
+
+    assert winners_values(streamed_file) == winners_values(expected_file)
+    assert (streamed.rows, streamed.contestants, streamed.classes, streamed.awards) == \
+           (expected.rows, expected.contestants, expected.classes, expected.awards)
@@ -0,0 +1,39 @@
+import openpyxl
+
+from calculator import calculate
+from watch import TrialWatcher
+
+
+def worksheets(workbook_file: str) -> dict:
+    workbook = openpyxl.load_workbook(workbook_file)
+    return {worksheet.title: list(worksheet.iter_rows(values_only=True)) for worksheet in workbook.worksheets}
+
+
+def test_updates_match_a_full_calculation(trial_file, tmp_path):
+    watch_file, full_file = str(tmp_path / "watch.xlsx"), str(tmp_path / "full.xlsx")
+    watcher = TrialWatcher(trial_file, watch_file, 'obedience')
+
+    def edit(worksheet) -> None:
+        worksheet.cell(row=3, column=5, value="199+")  # Max in Open B
+
+    def delete(worksheet) -> None:
+        worksheet.delete_rows(5)  # Pip, the high scorer of Utility B and of the trial
+
+    def insert(worksheet) -> None:
+        worksheet.append((106, "Fay", "Ace", "Novice A", "198+", "Hound", "Ch"))
+        worksheet.append((107, "Gus", "Kit", "Graduate Open", 200, "Toy", None))
+
+    # entries are identified by their row, so the classes of the rows below a deleted row are placed again
+    expected_changes = [["Open B", "Utility B", "Novice A", "Beginner Novice"], ["Open B"],
+                        ["Utility B", "Novice A", "Beginner Novice"], ["Novice A", "Graduate Open"]]
+    for change, changed_classes in zip((None, edit, delete, insert), expected_changes):
+        if change is not None:
+            workbook = openpyxl.load_workbook(trial_file)
+            change(workbook.active)
+            workbook.save(trial_file)
+
+        update = watcher.update()
+        calculate(trial_file, full_file, 'obedience')
+
+        assert update.changed_classes == changed_classes
+        assert worksheets(watch_file) == worksheets(full_file)
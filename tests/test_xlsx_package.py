@@ -0,0 +1,113 @@
+import re
+import zipfile
+
+import pytest
+from openpyxl import load_workbook
+
+from calculator import calculate
+from xlsx_package import STYLES_PART, CONTENT_TYPES_PART, WORKBOOK_PART, WORKBOOK_RELS_PART
+
+# the parts write_worksheet changes when it adds the Winners worksheet, the document properties are left as they are
+CHANGED_PARTS = {STYLES_PART, CONTENT_TYPES_PART, WORKBOOK_PART, WORKBOOK_RELS_PART}
+
+
+def read_parts(xlsx_file: str) -> dict[str: bytes]:
+    with zipfile.ZipFile(xlsx_file) as package:
+        return {name: package.read(name) for name in package.namelist()}
+
+
+def rewrite_parts(xlsx_file: str, edit) -> None:
+    """
+    Rewrites a package with edit applied to a dictionary of its parts.
+    """
+    parts = read_parts(xlsx_file)
+    edit(parts)
+    with zipfile.ZipFile(xlsx_file, 'w', zipfile.ZIP_DEFLATED) as package:
+        for name, data in parts.items():
+            package.writestr(name, data)
+
+
+def winners_values(xlsx_file: str) -> list[tuple]:
+    return list(load_workbook(xlsx_file)["Winners"].iter_rows(values_only=True))
+
+
+def new_file_values(trial_file: str, tmp_path) -> list[tuple]:
+    """
+    The Winners worksheet written by openpyxl to a new file, which the in place worksheet must match.
+    """
+    output_file = str(tmp_path / "trial_scores.xlsx")
+    calculate(trial_file, output_file, 'obedience')
+    return list(load_workbook(output_file).active.iter_rows(values_only=True))
+
+
+def test_in_place_keeps_other_parts(trial_file, tmp_path):
+    before = read_parts(trial_file)
+    calculate(trial_file, trial_file, 'obedience')
+    after = read_parts(trial_file)
+
+    workbook = load_workbook(trial_file)
+    assert workbook.sheetnames == ["Entries", "Winners"]
+    assert winners_values(trial_file) == new_file_values(trial_file, tmp_path)
+
+    new_parts = set(after) - set(before)
+    assert len(new_parts) == 1 and re.fullmatch(r'xl/worksheets/sheet\d+\.xml', new_parts.pop())
+    for name, data in before.items():
+        if name not in CHANGED_PARTS:
+            assert after[name] == data, name
+
+
+def test_rerun_replaces_winners(trial_file, tmp_path):
+    calculate(trial_file, trial_file, 'obedience')
+
+    # a corrected score, saved with the earlier Winners worksheet still in the workbook
+    workbook = load_workbook(trial_file)
+    workbook["Entries"]["E2"] = 200
+    workbook.save(trial_file)
+    calculate(trial_file, trial_file, 'obedience')
+
+    assert load_workbook(trial_file).sheetnames == ["Entries", "Winners"]
+    winners = winners_values(trial_file)
+    assert winners == new_file_values(trial_file, tmp_path)
+    assert (1, 101, "Ann", "Rex", "200") in winners
+
+
+def test_rerun_reuses_styles(trial_file):
+    calculate(trial_file, trial_file, 'obedience')
+    first = read_parts(trial_file)
+    calculate(trial_file, trial_file, 'obedience')
+    second = read_parts(trial_file)
+
+    assert set(second) == set(first)
+    for name in first:
+        assert second[name] == first[name], name
+
+
+def remove_style_containers(parts: dict[str: bytes]) -> None:
+    parts[STYLES_PART] = re.sub(rb'<(cellStyleXfs|cellStyles)\b.*?</\1>', b'', parts[STYLES_PART], flags=re.DOTALL)
+
+
+def remove_stylesheet(parts: dict[str: bytes]) -> None:
+    del parts[STYLES_PART]
+    parts[WORKBOOK_RELS_PART] = re.sub(rb'<Relationship\b[^>]*Target="[^"]*styles.xml"[^>]*/>', b'',
+                                       parts[WORKBOOK_RELS_PART])
+    parts[CONTENT_TYPES_PART] = re.sub(rb'<Override\b[^>]*PartName="/xl/styles.xml"[^>]*/>', b'',
+                                       parts[CONTENT_TYPES_PART])
+
+
+@pytest.mark.filterwarnings("ignore:Workbook contains no default style")
+@pytest.mark.parametrize("edit", [remove_style_containers, remove_stylesheet])
+def test_stylesheet_variants(trial_file, tmp_path, edit):
+    rewrite_parts(trial_file, edit)
+    calculate(trial_file, trial_file, 'obedience')
+
+    workbook = load_workbook(trial_file)
+    assert workbook.sheetnames == ["Entries", "Winners"]
+    assert {"Winners Bold", "Winners Heading", "Winners Place 1"} <= set(workbook.named_styles)
+    assert workbook["Winners"]["B1"].style == "Winners Heading" and workbook["Winners"]["B1"].font.b
+    assert workbook["Winners"]["B3"].style == "Winners Place 1"
+    assert workbook["Entries"]["A2"].style == "Normal" and not workbook["Entries"]["A2"].font.b
+    assert winners_values(trial_file) == new_file_values(trial_file, tmp_path)
+
+    first = read_parts(trial_file)
+    calculate(trial_file, trial_file, 'obedience')
+    assert read_parts(trial_file) == first